@@ -8,6 +8,9 @@ bl_info = {
     "category": "BIM",
 }
 
+import time
+_import_started = time.perf_counter()
+
 import bpy
 import os
 import sys
@@ -15,6 +18,23 @@ import site
 import tempfile
 import subprocess
 import importlib
+import importlib.util
+import functools
+import hashlib
+import heapq
+import math
+import re
+import io
+import json
+import shutil
+import struct
+import threading
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from itertools import groupby
+from operator import itemgetter
+from xml.sax.saxutils import escape as xml_escape
 
 # Fix Python path
 if sys.platform == "win32":
@@ -26,29 +46,43 @@ else:  # Linux and other Unix-like
 if site_packages_path not in sys.path:
     sys.path.append(site_packages_path)
 
-def install_and_import(package):
-    try:
-        importlib.import_module(package)
-    except ImportError:
-        python_executable = sys.executable
-        subprocess.check_call([python_executable, "-m", "ensurepip"])
-        subprocess.check_call([python_executable, "-m", "pip", "install", package, "--user"])
-    finally:
-        globals()[package] = importlib.import_module(package)
+# Optional Python packages, imported on first use: networkx converts graphs
+# for other tools, and both are needed by the last-resort matplotlib renderer
+GRAPH_DEPENDENCIES = ("networkx",)
+FALLBACK_DEPENDENCIES = ("matplotlib",)
+
+# Seconds the add-on may spend on import plus register() before a warning is printed
+REGISTER_TIME_BUDGET = 0.1
 
-# Install missing packages
-install_and_import('networkx')
-install_and_import('matplotlib')
-install_and_import('netgraph') 
-install_and_import('pydot') 
-install_and_import('graphviz') 
+nx = None
 
+def missing_packages(packages):
+    """Return the packages that cannot be found without importing them"""
+    importlib.invalidate_caches()
+    return [package for package in packages if importlib.util.find_spec(package) is None]
+
+def load_graph_dependencies():
+    """Import networkx on first use, raising ImportError with install instructions if it is missing"""
+    global nx
+    if nx is not None:
+        return
+    missing = missing_packages(GRAPH_DEPENDENCIES)
+    if missing:
+        raise ImportError(f"Missing Python packages: {', '.join(missing)}. "
+                          "Install them from the Bonsai Graph add-on preferences.")
+    nx = importlib.import_module("networkx")
+
+def install_packages(packages):
+    """Install packages into the user site-packages with Blender's own Python"""
+    python_executable = sys.executable
+    subprocess.check_call([python_executable, "-m", "ensurepip"])
+    subprocess.check_call([python_executable, "-m", "pip", "install", *packages, "--user"])
+    importlib.invalidate_caches()
 
-import networkx as nx
-import matplotlib.pyplot as plt
 import ifcopenshell
 import ifcopenshell.api
 import bonsai.tool as tool
+from bpy_extras.io_utils import ExportHelper
 from pprint import pprint
 
 # Add this after the imports section
@@ -69,7 +103,8 @@ def register_properties():
     # New properties for blacklist and relationship toggles
     bpy.types.Scene.ifc_graph_blacklist = bpy.props.StringProperty(
         name="Blacklist Items",
-        description="List of attributes to exclude (one per line)",
+        description="Attributes or classes to exclude, separated by commas or newlines. "
+                    "Class names also hide their subtypes, IfcClass.Attribute hides an attribute on one class",
         default="ObjectPlacement\nPlacementRelTo\nRelativePlacement\nOwnerHistory",
         subtype='NONE'  # This allows multiline editing in the UI
     )
@@ -105,6 +140,93 @@ def register_properties():
         default=True
     )
 
+    bpy.types.Scene.ifc_graph_live_update = bpy.props.BoolProperty(
+        name="Live Update",
+        description="Regenerate the attribute graph shortly after the selection changes",
+        default=False
+    )
+
+    bpy.types.Scene.ifc_graph_all_selected = bpy.props.BoolProperty(
+        name="All Selected Objects",
+        description="Graph all selected IFC objects in one traversal instead of only the active one",
+        default=False
+    )
+
+    bpy.types.Scene.ifc_graph_inverse_depth = bpy.props.IntProperty(
+        name="Inverse Depth",
+        description="Follow inverse relationships of entities up to this many steps from the selection (1 for the selection only)",
+        default=1,
+        min=1,
+        max=10
+    )
+
+    bpy.types.Scene.ifc_graph_node_budget = bpy.props.IntProperty(
+        name="Node Budget",
+        description="Maximum number of entities in the attribute graph, the rest is collapsed into summary nodes (0 for no limit)",
+        default=300,
+        min=0
+    )
+
+    bpy.types.Scene.ifc_graph_fanout_limit = bpy.props.IntProperty(
+        name="Fan-out Limit",
+        description="Maximum number of entities shown per attribute, the rest is collapsed into a summary node (0 for no limit)",
+        default=20,
+        min=0
+    )
+
+    bpy.types.Scene.ifc_graph_path_count = bpy.props.IntProperty(
+        name="Paths",
+        description="Number of shortest connections to show between the two selected objects",
+        default=1,
+        min=1,
+        max=20
+    )
+
+    bpy.types.Scene.ifc_graph_path_search_budget = bpy.props.IntProperty(
+        name="Search Budget",
+        description="Give up a connection search after expanding this many entities (0 for no limit)",
+        default=PATH_SEARCH_BUDGET,
+        min=0
+    )
+
+    bpy.types.Scene.ifc_graph_max_megapixels = bpy.props.FloatProperty(
+        name="Max Megapixels",
+        description="Largest graph image to render, bigger graphs are shown as a zoomable overview",
+        default=DEFAULT_PIXEL_BUDGET / 1000000,
+        min=1.0,
+        max=256.0
+    )
+
+    bpy.types.Scene.ifc_graph_fast_layout_nodes = bpy.props.IntProperty(
+        name="Fast Layout Above",
+        description="Lay out graphs with more nodes than this with the fast layout (0 to always use dot)",
+        default=FAST_LAYOUT_NODE_COUNT,
+        min=0
+    )
+
+    bpy.types.Scene.ifc_graph_fast_layout = bpy.props.EnumProperty(
+        name="Fast Layout",
+        description="Layout used for graphs above the fast layout node count",
+        items=[
+            ('SFDP', "sfdp", "Scalable force-directed layout, keeps the attribute records"),
+            ('PLAIN', "Plain Boxes", "Hierarchical dot layout with nodes drawn as boxes showing only their names"),
+        ],
+        default='SFDP'
+    )
+
+    bpy.types.Scene.ifc_graph_stable_layout = bpy.props.BoolProperty(
+        name="Keep Node Positions",
+        description="Keep entities where they were in the previous graph and only place new ones. "
+                    "Graphs laid out this way are force-directed instead of dot's left to right hierarchy",
+        default=False
+    )
+
+    bpy.types.Scene.ifc_graph_show_timings = bpy.props.BoolProperty(
+        name="Last Run Timings",
+        description="Show where the time of the last generated graph was spent",
+        default=False
+    )
+
 def unregister_properties():
     del bpy.types.Scene.ifc_graph_max_depth
     del bpy.types.Scene.ifc_graph_show_inverse
@@ -116,6 +238,18 @@ def unregister_properties():
     del bpy.types.Scene.ifc_graph_show_defines
     del bpy.types.Scene.ifc_graph_show_material
     del bpy.types.Scene.ifc_graph_show_type
+    del bpy.types.Scene.ifc_graph_inverse_depth
+    del bpy.types.Scene.ifc_graph_all_selected
+    del bpy.types.Scene.ifc_graph_live_update
+    del bpy.types.Scene.ifc_graph_node_budget
+    del bpy.types.Scene.ifc_graph_fanout_limit
+    del bpy.types.Scene.ifc_graph_path_count
+    del bpy.types.Scene.ifc_graph_path_search_budget
+    del bpy.types.Scene.ifc_graph_max_megapixels
+    del bpy.types.Scene.ifc_graph_fast_layout_nodes
+    del bpy.types.Scene.ifc_graph_fast_layout
+    del bpy.types.Scene.ifc_graph_stable_layout
+    del bpy.types.Scene.ifc_graph_show_timings
 
 # --- Utility Functions ---
 
@@ -155,39 +289,577 @@ def get_selected_ifc_class():
     
     return None
 
-def build_ifc_hierarchy_graph(ifc_class_name):
-    graph = nx.DiGraph()
+def get_selected_roots(context, ifc_file):
+    """The active IFC entity, followed by the other selected ones if All Selected Objects is on"""
+    roots = [ifc_file.by_id(get_ifc_definition_id(context.active_object))]
+    if context.scene.ifc_graph_all_selected:
+        roots.extend(ifc_file.by_id(get_ifc_definition_id(obj)) for obj in context.selected_objects
+                     if obj is not context.active_object and get_ifc_definition_id(obj))
+    return roots
+
+def get_ifc_definition_id(obj):
+    """Step id of the IFC entity linked to a Blender object, or 0"""
+    properties = getattr(obj, "BIMObjectProperties", None)
+    return int(properties.ifc_definition_id) if properties is not None else 0
+
+# --- Instrumentation ---
+
+class GraphRunStats:
+    """Wall time per phase and counters of one graph generation run
+
+    Phases are timed with phase() around whole steps, or add_time() for work
+    that is interleaved with other work, such as inverse lookups during the
+    traversal. Nested phases overlap, "inverse lookup" is part of "traversal".
+    Node labels are rendered in "labels" before a background render starts,
+    or as part of "dot conversion" when the graph is rendered synchronously.
+    """
+
+    def __init__(self, title=""):
+        self.title = title
+        self.started_at = time.time()
+        self.seconds = None
+        self.phases = {}
+        self.counters = {}
+
+    def finish(self):
+        """Record the wall time of the whole run, including time spent waiting between phases"""
+        self.seconds = time.time() - self.started_at
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def hit_rate(self, name):
+        """Hit rate of the "<name> hits" and "<name> misses" counters, or None if there were no lookups"""
+        hits = self.counters.get(f"{name} hits", 0)
+        lookups = hits + self.counters.get(f"{name} misses", 0)
+        return hits / lookups if lookups else None
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "started_at": self.started_at,
+            "seconds": None if self.seconds is None else round(self.seconds, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+    def summary_lines(self):
+        """Short human readable lines for the panel"""
+        lines = [f"Total: {self.seconds * 1000:.0f} ms"] if self.seconds is not None else []
+        lines.extend(f"{name.capitalize()}: {seconds * 1000:.0f} ms" for name, seconds in self.phases.items())
+        if "nodes" in self.counters:
+            lines.append(f"{self.counters['nodes']} nodes, {self.counters.get('edges', 0)} edges")
+        for cache_name in ("entity cache", "render cache"):
+            rate = self.hit_rate(cache_name)
+            if rate is not None:
+                lines.append(f"{cache_name.capitalize()} hits: {rate:.0%}")
+        return lines
+
+def append_run_log(stats, path):
+    """Append stats to a JSON-lines log for offline analysis"""
+    try:
+        with open(bpy.path.abspath(path), "a", encoding="utf-8") as f:
+            f.write(json.dumps(stats.to_dict()) + "\n")
+    except OSError as e:
+        print(f"Could not write graph timing log {path}: {e}")
+
+# --- Compact Graph ---
+
+class CompactGraph:
+    """Directed graph over integer node keys with array-backed edge storage
+
+    Nodes are numbered densely in insertion order and edges are stored as
+    parallel arrays of node positions and interned edge label ids. Adding an
+    edge between the same pair again replaces its label, as in networkx.
+    Subclasses turn keys into DOT node names and labels when the graph is
+    emitted; networkx is only needed for to_networkx().
+    """
+
+    __slots__ = ("keys", "positions", "selected", "edge_sources", "edge_targets", "edge_label_ids",
+                 "edge_indices", "label_names", "label_ids")
+
+    def __init__(self):
+        self.keys = array('q')
+        self.positions = {}
+        # Keys of the highlighted nodes, the roots of the graph
+        self.selected = set()
+        self.edge_sources = array('I')
+        self.edge_targets = array('I')
+        self.edge_label_ids = array('I')
+        # Edge index by (source position << 32 | target position)
+        self.edge_indices = {}
+        # Label id 0 stands for an edge without a label
+        self.label_names = [None]
+        self.label_ids = {}
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def __len__(self):
+        return len(self.keys)
+
+    def number_of_nodes(self):
+        return len(self.keys)
+
+    def number_of_edges(self):
+        return len(self.edge_sources)
+
+    def add_node(self, key):
+        """Add key, returning False if it was already in the graph"""
+        if key in self.positions:
+            return False
+        self.positions[key] = len(self.keys)
+        self.keys.append(key)
+        return True
+
+    def add_edge(self, source, target, label=None):
+        label_id = 0
+        if label is not None:
+            label_id = self.label_ids.get(label)
+            if label_id is None:
+                label_id = self.label_ids[label] = len(self.label_names)
+                self.label_names.append(label)
+        source_position = self.positions[source]
+        target_position = self.positions[target]
+        edge_key = source_position << 32 | target_position
+        edge_index = self.edge_indices.get(edge_key)
+        if edge_index is None:
+            self.edge_indices[edge_key] = len(self.edge_sources)
+            self.edge_sources.append(source_position)
+            self.edge_targets.append(target_position)
+            self.edge_label_ids.append(label_id)
+        else:
+            self.edge_label_ids[edge_index] = label_id
+
+    def copy_nodes_and_edges(self, other):
+        """Replace the nodes, highlight and edges of this graph by copies of those of other"""
+        self.keys = array('q', other.keys)
+        self.positions = dict(other.positions)
+        self.selected = set(other.selected)
+        self.edge_sources = array('I', other.edge_sources)
+        self.edge_targets = array('I', other.edge_targets)
+        self.edge_label_ids = array('I', other.edge_label_ids)
+        self.edge_indices = dict(other.edge_indices)
+        self.label_names = list(other.label_names)
+        self.label_ids = dict(other.label_ids)
+
+    def iter_edges(self):
+        """Yield (source key, target key, label or None) grouped by source node, like networkx
 
-    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name("IFC4")  # Assume IFC4 (could be dynamic)
+        Within a source, edges keep their insertion order. Graphviz layouts
+        depend on edge order, so this keeps renderings of the same graph stable.
+        """
+        keys = self.keys
+        label_names = self.label_names
+        edge_sources = self.edge_sources
+        for edge_index in sorted(range(len(edge_sources)), key=edge_sources.__getitem__):
+            yield (keys[edge_sources[edge_index]], keys[self.edge_targets[edge_index]],
+                   label_names[self.edge_label_ids[edge_index]])
 
-    if not schema.declaration_by_name(ifc_class_name):
+    def node_name(self, key):
+        raise NotImplementedError
+
+    def node_label(self, key):
+        """DOT record label of key, already escaped, or None to show its name"""
+        return None
+
+    def node_style(self, key):
+        """'selected', 'summary' or None"""
+        return 'selected' if key in self.selected else None
+
+    def node_attributes(self, key):
+        """Further DOT attributes of key with a leading comma, empty for none"""
+        return ""
+
+    def to_networkx(self):
+        """Convert to a networkx DiGraph keyed by node name"""
+        load_graph_dependencies()
+        graph = nx.DiGraph()
+        for key in self.keys:
+            graph.add_node(self.node_name(key), is_selected=key in self.selected)
+        for source, target, label in self.iter_edges():
+            graph.add_edge(self.node_name(source), self.node_name(target), label=label)
+        return graph
+
+class SummaryNode:
+    """Related entities collapsed into one "+N more" node"""
+
+    __slots__ = ("name", "label", "summary_key", "summary_text", "collapsed_ids")
+
+    def __init__(self, name, label, summary_key, summary_text, collapsed_ids):
+        self.name = name
+        self.label = label
+        self.summary_key = summary_key
+        self.summary_text = summary_text
+        self.collapsed_ids = collapsed_ids
+
+class AttributeGraph(CompactGraph):
+    """Entities of one IFC file keyed by step id, with labels rendered only when emitted
+
+    Inline values such as IfcLabel have no step id; like before they share one
+    node per class, under a negative key. Summary nodes get negative keys too.
+    The keys whose forward and inverse relationships were added are kept so
+    a later traversal can extend the graph without expanding them again.
+    """
+
+    __slots__ = ("ifc_file", "inline_keys", "inline_entities", "summaries", "next_synthetic_key",
+                 "expanded_forward", "expanded_inverse")
+
+    def __init__(self, ifc_file):
+        super().__init__()
+        self.ifc_file = ifc_file
+        self.inline_keys = {}
+        self.inline_entities = {}
+        self.summaries = {}
+        self.next_synthetic_key = -1
+        self.expanded_forward = set()
+        self.expanded_inverse = set()
+
+    def copy(self):
+        """Return a copy that can be extended without changing this graph"""
+        graph = AttributeGraph(self.ifc_file)
+        graph.copy_nodes_and_edges(self)
+        graph.inline_keys = dict(self.inline_keys)
+        graph.inline_entities = dict(self.inline_entities)
+        graph.summaries = dict(self.summaries)
+        graph.next_synthetic_key = self.next_synthetic_key
+        graph.expanded_forward = set(self.expanded_forward)
+        graph.expanded_inverse = set(self.expanded_inverse)
+        return graph
+
+    def synthetic_key(self):
+        key = self.next_synthetic_key
+        self.next_synthetic_key -= 1
+        return key
+
+    def entity_key(self, entity):
+        entity_id = entity.id()
+        if entity_id:
+            return entity_id
+        entity_class = entity.is_a()
+        key = self.inline_keys.get(entity_class)
+        if key is None:
+            key = self.inline_keys[entity_class] = self.synthetic_key()
+            self.inline_entities[key] = entity
+        return key
+
+    def entity(self, key):
+        if key > 0:
+            return self.ifc_file.by_id(key)
+        return self.inline_entities.get(key)
+
+    def entities(self):
+        """Entities with a step id, in the order they were added"""
+        return [self.ifc_file.by_id(key) for key in self.keys if key > 0]
+
+    def add_summary(self, summary):
+        key = self.synthetic_key()
+        self.summaries[key] = summary
+        self.add_node(key)
+        return key
+
+    def node_name(self, key):
+        summary = self.summaries.get(key)
+        if summary is not None:
+            return summary.name
+        entity = self.entity(key)
+        return f"#{entity.id()} {entity.is_a()}"
+
+    def node_label(self, key):
+        summary = self.summaries.get(key)
+        if summary is not None:
+            return summary.label
+        return get_entity_cache(self.ifc_file).label(self.entity(key))
+
+    def node_style(self, key):
+        if key in self.summaries:
+            return 'summary'
+        return super().node_style(key)
+
+class HierarchyGraph(CompactGraph):
+    """Classes of a ClassHierarchyIndex keyed by their index"""
+
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def node_name(self, key):
+        return self.index.names[key]
+
+class GraphSnapshot(CompactGraph):
+    """Copy of a graph with the name, label and style of every node already rendered
+
+    Labels of attribute graphs are read from the IFC file, which must only
+    happen on Blender's main thread while Bonsai may be editing it. Render
+    jobs work on a snapshot taken on the main thread instead of the graph.
+    """
+
+    __slots__ = ("names", "labels", "styles", "attributes")
+
+    def __init__(self, graph):
+        super().__init__()
+        self.copy_nodes_and_edges(graph)
+        self.names = [graph.node_name(key) for key in graph.keys]
+        self.labels = [graph.node_label(key) for key in graph.keys]
+        self.styles = [graph.node_style(key) for key in graph.keys]
+        self.attributes = [graph.node_attributes(key) for key in graph.keys]
+
+    def node_name(self, key):
+        return self.names[self.positions[key]]
+
+    def node_label(self, key):
+        return self.labels[self.positions[key]]
+
+    def node_style(self, key):
+        return self.styles[self.positions[key]]
+
+    def node_attributes(self, key):
+        return self.attributes[self.positions[key]]
+
+# --- Class Hierarchy Index ---
+
+# Bump when the serialized layout of ClassHierarchyIndex changes
+CLASS_HIERARCHY_INDEX_VERSION = 2
+
+class ClassHierarchyIndex:
+    """Entity inheritance of one IFC schema as integer arrays with precomputed closures
+
+    Classes are numbered in schema declaration order. parents holds the index of
+    each class' supertype (-1 for roots) and children its direct subtypes in
+    schema order. ancestors lists the supertypes from the direct parent up to
+    the root and descendants all subtypes in depth-first order.
+    """
+
+    def __init__(self, schema_name, names, parents):
+        self.schema_name = schema_name
+        self.names = names
+        self.parents = parents
+        self.index_by_name = {name.lower(): i for i, name in enumerate(names)}
+
+        self.children = [[] for _ in names]
+        for i, parent in enumerate(parents):
+            if parent >= 0:
+                self.children[parent].append(i)
+
+        self.ancestors = []
+        for i in range(len(names)):
+            chain = []
+            parent = parents[i]
+            while parent >= 0:
+                chain.append(parent)
+                parent = parents[parent]
+            self.ancestors.append(tuple(chain))
+
+        self.descendants = [None] * len(names)
+        for i in range(len(names)):
+            if self.descendants[i] is None:
+                self._collect_descendants(i)
+
+    def _collect_descendants(self, root):
+        # Iterative post-order so deep hierarchies never hit the recursion limit
+        stack = [(root, False)]
+        while stack:
+            i, children_done = stack.pop()
+            if children_done:
+                collected = []
+                for child in self.children[i]:
+                    collected.append(child)
+                    collected.extend(self.descendants[child])
+                self.descendants[i] = tuple(collected)
+                continue
+            stack.append((i, True))
+            for child in self.children[i]:
+                if self.descendants[child] is None:
+                    stack.append((child, False))
+
+    @classmethod
+    def from_schema(cls, schema_name):
+        wrapper = ifcopenshell.ifcopenshell_wrapper
+        schema = wrapper.schema_by_name(schema_name)
+        entities = [d for d in schema.declarations() if isinstance(d, wrapper.entity)]
+        index_by_name = {entity.name(): i for i, entity in enumerate(entities)}
+        names = [entity.name() for entity in entities]
+        parents = [index_by_name[entity.supertype().name()] if entity.supertype() else -1
+                   for entity in entities]
+        return cls(schema_name, names, parents)
+
+    def to_dict(self):
+        return {
+            "version": CLASS_HIERARCHY_INDEX_VERSION,
+            "ifcopenshell": ifcopenshell.version,
+            "schema": self.schema_name,
+            "names": self.names,
+            "parents": self.parents,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an index from to_dict() output, None if it was written by another version"""
+        if data.get("version") != CLASS_HIERARCHY_INDEX_VERSION or data.get("ifcopenshell") != ifcopenshell.version:
+            return None
+        return cls(data["schema"], data["names"], data["parents"])
+
+    def find(self, class_name):
+        """Return the index of class_name (case-insensitive) or None"""
+        return self.index_by_name.get(class_name.lower())
+
+_class_hierarchy_indices = {}
+
+def get_class_hierarchy_index(schema_name):
+    """Return the session-wide index of schema_name, loading or writing its on-disk copy"""
+    schema_name = schema_name.upper()
+    index = _class_hierarchy_indices.get(schema_name)
+    if index is not None:
+        return index
+
+    path = os.path.join(get_user_cache_dir("class_hierarchy"), f"{schema_name}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = ClassHierarchyIndex.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        index = None
+
+    if index is None:
+        index = ClassHierarchyIndex.from_schema(schema_name)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(index.to_dict(), f)
+        except OSError as e:
+            print(f"Could not write class hierarchy index to {path}: {e}")
+
+    _class_hierarchy_indices[schema_name] = index
+    return index
+
+def get_model_schema_name(default="IFC4"):
+    """Schema of the loaded IFC file, e.g. IFC2X3, IFC4 or IFC4X3"""
+    ifc_file = tool.Ifc.get()
+    return ifc_file.schema if ifc_file is not None else default
+
+def build_ifc_hierarchy_graph(ifc_class_name, schema_name=None):
+    index = get_class_hierarchy_index(schema_name or get_model_schema_name())
+    graph = HierarchyGraph(index)
+    selected = index.find(ifc_class_name)
+    if selected is None:
         return graph
 
-    def add_supertypes(entity_name):
-        entity = schema.declaration_by_name(entity_name)
-        # Add node with is_selected attribute for the current selection
-        is_selected = (entity.name() == ifc_class_name)
-        graph.add_node(entity.name(), is_selected=is_selected)
-        supertype = entity.supertype()
-        if supertype:
-            graph.add_edge(supertype.name(), entity.name())
-            add_supertypes(supertype.name())
-
-    def add_subtypes(entity_name):
-        entity = schema.declaration_by_name(entity_name)
-        # Add node with is_selected attribute for the current selection
-        is_selected = (entity.name() == ifc_class_name)
-        graph.add_node(entity.name(), is_selected=is_selected)
-        for subtype in entity.subtypes():
-            graph.add_edge(entity.name(), subtype.name())
-            add_subtypes(subtype.name())
-
-    add_supertypes(ifc_class_name)
-    add_subtypes(ifc_class_name)
+    parents = index.parents
+
+    # Selection and its supertypes up to the root
+    graph.add_node(selected)
+    graph.selected.add(selected)
+    child = selected
+    for ancestor in index.ancestors[selected]:
+        graph.add_node(ancestor)
+        graph.add_edge(ancestor, child)
+        child = ancestor
+
+    # All subtypes, each connected to its direct supertype
+    for descendant in index.descendants[selected]:
+        graph.add_node(descendant)
+        graph.add_edge(parents[descendant], descendant)
 
     return graph
 
-def create_dot_node_label(entity):
+# Longest attribute value shown in a record label, longer values end in "..."
+LABEL_VALUE_MAX_LENGTH = 30
+# Numeric aggregates with more values than this are shown by type and shape, e.g. float[12345×3]
+LABEL_AGGREGATE_MAX_VALUES = 4
+
+# Characters with a meaning in DOT strings or record labels
+DOT_RECORD_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "|": "\\|", "{": "\\{", "}": "\\}",
+                                    "<": "\\<", ">": "\\>", "\n": " ", "\r": " "})
+
+def escape_record_text(text):
+    """Escape text for a DOT record label in one pass"""
+    return text.translate(DOT_RECORD_ESCAPES)
+
+def aggregate_shape(value):
+    """Return the first leaf and the length per nesting level of a non-empty aggregate
+
+    Only the first and last item of each level are looked at, so this takes
+    constant time; a level whose items differ in length shows as "?".
+    """
+    dimensions = [str(len(value))]
+    count = len(value)
+    item = value
+    while item and isinstance(item[0], (list, tuple)):
+        first, last = item[0], item[-1]
+        dimensions.append(str(len(first)) if len(first) == len(last) else "?")
+        count *= len(first)
+        item = first
+    return (item[0] if item else None), dimensions, count
+
+def iter_value_text(value, limit):
+    """Yield the text of value in pieces, as str() would build it
+
+    Entities show as "#id Class" and strings are cut after limit characters,
+    so no piece grows with the size of the value.
+    """
+    if isinstance(value, (list, tuple)):
+        is_tuple = isinstance(value, tuple)
+        yield "(" if is_tuple else "["
+        for item_index, item in enumerate(value):
+            if item_index:
+                yield ", "
+            yield from iter_value_text(item, limit)
+        if is_tuple and len(value) == 1:
+            yield ","
+        yield ")" if is_tuple else "]"
+    elif isinstance(value, ifcopenshell.entity_instance):
+        yield f"#{value.id()} {value.is_a()}"
+    elif isinstance(value, str):
+        yield repr(value[:limit])
+    else:
+        yield str(value)
+
+def format_label_value(value, max_length=LABEL_VALUE_MAX_LENGTH):
+    """Format an attribute value for a record label, building no more than the shown text
+
+    Aggregates of entities show their length and large numeric aggregates
+    their type and shape. Other values are formatted piece by piece until
+    max_length is exceeded, so labeling takes the same time for a point
+    list of any size.
+    """
+    if value is None:
+        return "None"
+    if isinstance(value, ifcopenshell.entity_instance):
+        text = f"#{value.id()} {value.is_a()}"
+    elif isinstance(value, str):
+        text = value[:max_length + 1]
+    else:
+        if isinstance(value, (list, tuple)) and value:
+            if isinstance(value[0], ifcopenshell.entity_instance):
+                return f"[{len(value)} items]"
+            leaf, dimensions, count = aggregate_shape(value)
+            if isinstance(leaf, (int, float)) and count > LABEL_AGGREGATE_MAX_VALUES:
+                return f"{type(leaf).__name__}[{'×'.join(dimensions)}]"
+        pieces = []
+        length = 0
+        for piece in iter_value_text(value, max_length + 1):
+            pieces.append(piece)
+            length += len(piece)
+            if length > max_length:
+                break
+        text = "".join(pieces)
+    # Truncate long values
+    if len(text) > max_length:
+        text = text[:max_length - 3] + "..."
+    return text
+
+def create_dot_node_label(entity, entity_info=None):
     """Create a DOT-compatible record-shaped label for an IFC entity"""
     if not isinstance(entity, ifcopenshell.entity_instance):
         return ""
@@ -195,364 +867,2474 @@ def create_dot_node_label(entity):
     # Get entity info
     entity_id = entity.id()
     entity_type = entity.is_a()
-    entity_info = entity.get_info(False)
+    if entity_info is None:
+        entity_info = entity.get_info(False)
     
     # Create header for the record
     header = f"#{entity_id} = {entity_type}"
     
-    # Create attribute slots
+    # Create attribute slots, with the port named after the attribute
     slots = []
     for attr_name, attr_value in entity_info.items():
-        # Format the attribute value based on its type
-        if attr_value is None:
-            formatted_value = "None"
-        elif isinstance(attr_value, ifcopenshell.entity_instance):
-            formatted_value = f"#{attr_value.id()} {attr_value.is_a()}"
-        elif isinstance(attr_value, (list, tuple)):
-            if len(attr_value) > 0 and isinstance(attr_value[0], ifcopenshell.entity_instance):
-                formatted_value = f"[{len(attr_value)} items]"
-            else:
-                formatted_value = str(attr_value)
-        else:
-            formatted_value = str(attr_value)
-            
-        # Truncate long values
-        if len(formatted_value) > 30:
-            formatted_value = formatted_value[:27] + "..."
-            
-        # Escape special characters for DOT
-        formatted_value = formatted_value.replace('"', '\\"').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}')
-        attr_name = attr_name.replace('"', '\\"').replace('|', '\\|').replace('{', '\\{').replace('}', '\\}')
-        
-        # Add to slots with port name
-        slots.append(f"<{attr_name}> {attr_name}: {formatted_value}")
+        attr_name = escape_record_text(attr_name)
+        slots.append(f"<{attr_name}> {attr_name}: {escape_record_text(format_label_value(attr_value))}")
     
     # Combine into a record-style label
     label = f"{{{header}|{{{' | '.join(slots)}}}}}"
     
     return label
 
-def build_recursive_attribute_graph(ifc_entity, blacklist=None, max_depth=1, show_inverse=True, 
-                                    show_containment=True, show_aggregates=True, show_defines=True,
-                                    show_material=True, show_type=True):
-        # Get blacklist from scene settings, splitting by newlines instead of commas
-    try:
-        blacklist = [item.strip() for item in bpy.context.scene.ifc_graph_blacklist.split(',')]
-        print(f"Blacklist: {blacklist}")
-    except (AttributeError, KeyError):
-        fallback_blacklist = ['ObjectPlacement', 'PlacementRelTo', 'RelativePlacement', 'OwnerHistory']
-        print(f"Could not read user blacklist : {blacklist}, using {fallback_blacklist}")
-        blacklist = fallback_blacklist
-    graph = nx.DiGraph()
-    edge_labels = {}
-    
-    # Get the entity ID of the selected entity for highlighting
-    selected_entity_id = ifc_entity.id()
-    
-    def should_show_relationship(entity, attr_name):
-        """Determine if a relationship should be shown based on user settings"""
-        if not isinstance(entity, ifcopenshell.entity_instance):
-            return True
-            
-        entity_type = entity.is_a()
-        
-        # Check relationship type toggles
-        if entity_type == "IfcRelContainedInSpatialStructure" and not show_containment:
-            return False
-        if entity_type == "IfcRelAggregates" and not show_aggregates:
-            return False
-        if entity_type == "IfcRelDefinesByProperties" and not show_defines:
-            return False
-        if entity_type == "IfcRelDefinesByType" and not show_type:
-            return False
-        if entity_type in ["IfcRelAssociatesMaterial", "IfcMaterial", "IfcMaterialLayerSet"] and not show_material:
-            return False
-            
-        return True
-    
-    def add_entity_to_graph(entity, current_depth):
-        if entity is None or not isinstance(entity, ifcopenshell.entity_instance):
-            return
-        
-        entity_name = f"#{entity.id()} {entity.is_a()}"
-        # Mark if this is the selected entity
-        is_selected = (entity.id() == selected_entity_id)
-        
-        # Create a DOT-compatible record label
-        dot_label = create_dot_node_label(entity)
-        
-        graph.add_node(entity_name, label=dot_label, is_selected=is_selected)
-        # print(f"{entity_name}, depth={current_depth}")
-        
-        if current_depth > max_depth:
-            return
-        
-        # Forward relationships using get_info(False)
-        for attr_name in entity.get_info(False):
-            if attr_name in blacklist:
-                continue
+# --- Entity Cache ---
+
+# Maximum number of entities whose decoded attributes and labels are kept
+ENTITY_CACHE_MAX_SIZE = 50000
+
+class EntityCacheEntry:
+    """Forward references and record label of one entity
+
+    The decoded attributes are not kept, so entries of geometry with long
+    coordinate lists stay small. They are decoded again for the label.
+    """
+    __slots__ = ("references", "label")
 
-            attr_value = getattr(entity, attr_name, None)
+    def __init__(self, entity):
+        # (attribute name, referenced entity) pairs in attribute order
+        self.references = []
+        for attr_name, attr_value in entity.get_info(False).items():
             if isinstance(attr_value, ifcopenshell.entity_instance):
-                if should_show_relationship(attr_value, attr_name):
-                    related_entity_name = f"#{attr_value.id()} {attr_value.is_a()}"
-                    graph.add_edge(entity_name, related_entity_name, label=attr_name)
-                    edge_labels[(entity_name, related_entity_name)] = attr_name
-                    add_entity_to_graph(attr_value, current_depth + 1)
+                self.references.append((attr_name, attr_value))
             elif isinstance(attr_value, (list, tuple)):
                 for item in attr_value:
                     if isinstance(item, ifcopenshell.entity_instance):
-                        if should_show_relationship(item, attr_name):
-                            related_entity_name = f"#{item.id()} {item.is_a()}"
-                            graph.add_edge(entity_name, related_entity_name, label=attr_name)
-                            edge_labels[(entity_name, related_entity_name)] = attr_name
-                            add_entity_to_graph(item, current_depth + 1)
-
-        # Inverse relationships using tool.Ifc.get().get_inverse() with a single attribute index
-        if current_depth != 0 or not show_inverse:
+                        self.references.append((attr_name, item))
+        # Rendered on first use, most entries are only ever traversed
+        self.label = None
+
+class EntityCache:
+    """LRU cache of entity info and DOT labels for a single IFC file, keyed by entity id"""
+
+    def __init__(self, ifc_file, max_size=ENTITY_CACHE_MAX_SIZE):
+        self.ifc_file = ifc_file
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, entity):
+        entity_id = entity.id()
+        if entity_id == 0:
+            # Inline values such as IfcLabel have no id of their own and are cheap to decode
+            return EntityCacheEntry(entity)
+        entry = self.entries.get(entity_id)
+        if entry is not None:
+            self.entries.move_to_end(entity_id)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = EntityCacheEntry(entity)
+        self.entries[entity_id] = entry
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return entry
+
+    def references(self, entity):
+        return self.get(entity).references
+
+    def label(self, entity):
+        entry = self.get(entity)
+        if entry.label is None:
+            entry.label = create_dot_node_label(entity)
+        return entry.label
+
+    def invalidate(self, entity_ids=None):
+        """Drop the given entity ids, or everything if no ids are given"""
+        if entity_ids is None:
+            self.entries.clear()
             return
-                
-        inverse_relationships = tool.Ifc.get().get_inverse(entity, True, with_attribute_indices=True)
-        
-        for inverse_rel in inverse_relationships:
-            if isinstance(inverse_rel, tuple):
-                # Ensure the tuple has the expected number of elements
-                if len(inverse_rel) == 2:
-                    inverse_entity, inverse_attr_index = inverse_rel
-                    if isinstance(inverse_entity, ifcopenshell.entity_instance) and not (entity.is_a() == "IfcOwnerHistory"):
-                        if should_show_relationship(inverse_entity, None):
-                            ref_entity_name = f"#{inverse_entity.id()} {inverse_entity.is_a()}"
-                            print(f"Inverse relationship: {ref_entity_name} -> {entity_name}")            
-                            # Lookup attribute name using the single index
-                            inverse_attr_name = inverse_entity.attribute_name(inverse_attr_index)
-                            graph.add_edge(ref_entity_name, entity_name, label=f"(inverse) {inverse_attr_name}")
-                            edge_labels[(ref_entity_name, entity_name)] = f"(inverse) {inverse_attr_name}"
-                            # Just add this, go over maximum depth of 3 
-                            add_entity_to_graph(inverse_entity, current_depth + 1)
-
-    add_entity_to_graph(ifc_entity, 0)
-    return graph, edge_labels
-
-def draw_graph_to_image(graph, edge_labels, title="IFC Class Hierarchy", use_dot_layout=True):
-    # Get the directory of the current script
-    script_dir = os.path.dirname(os.path.realpath(__file__))
-    
-    # Define output paths in the script directory
-    png_path = os.path.join(script_dir, "ifc_hierarchy_graph.png")
-    dot_path = os.path.join(script_dir, "ifc_hierarchy_graph.dot")
-    
-    default_dpi = plt.rcParams['figure.dpi']
+        for entity_id in entity_ids:
+            self.entries.pop(entity_id, None)
 
-    # Create a Matplotlib figure and axes
-    fig = plt.figure(figsize=(2048/ default_dpi, 2048 / default_dpi), dpi=default_dpi)
-    if use_dot_layout:
-        # Use Graphviz's dot layout
-        try:
-            # Create a pydot graph
-            pydot_graph = nx.nx_pydot.to_pydot(graph)
-            
-            # Set node attributes
-            for node in pydot_graph.get_nodes():
-                node_name = node.get_name().strip('"')
-                if node_name in graph.nodes:
-                    # Get node attributes
-                    attrs = graph.nodes[node_name]
-                    
-                    # Set label from the pre-formatted DOT record label
-                    if 'label' in attrs:
-                        node.set_label(attrs["label"])
-                    else:
-                        node.set_label(f'"{node_name}"')
-                    
-                    # Set node shape to record for structured display
-                    node.set_shape('record')
-                    node.set_fontname('Arial')
-                    
-                    # Set color to red if this is the selected node
-                    if 'is_selected' in attrs and attrs['is_selected']:
-                        node.set_color('red')
-                        node.set_style('filled')
-                        node.set_fillcolor('lightpink')
-                        node.set_fontcolor('black')
-            
-            # Set edge attributes with proper ports for connecting to specific attributes
-            for edge in pydot_graph.get_edges():
-                source = edge.get_source().strip('"')
-                target = edge.get_destination().strip('"')
-                
-                # Get the edge label
-                edge_key = (source, target)
-                if edge_key in edge_labels:
-                    attr_name = edge_labels[edge_key]
-                    edge.set_label(f' {attr_name} ')
-                    
-                    # Connect from the specific attribute port if it's not an inverse relationship
-                    if not attr_name.startswith('(inverse)'):
-                        # Make sure attribute name is valid for a port ID (alphanumeric and underscore only)
-                        port_name = ''.join(c if c.isalnum() or c == '_' else '_' for c in attr_name)
-                        edge.set_tailport(port_name)
-            
-            pydot_graph.set_rankdir("LR")
-            pydot_graph.set_graph_defaults(dpi="300")
-            # pydot_graph.set_graph_defaults(size="30.83,30.83!", dpi="96")
-            pydot_graph.set_graph_defaults(fontname="Arial", fontsize="14")
-            pydot_graph.set("layout", "dot")
-            pydot_graph.set("concentrate", "true")  # Merge edges where possible
-            
-            # Save as DOT file in the script directory
-            print(f"Saving DOT file to: {dot_path}")
-            pydot_graph.write_raw(dot_path)
-            
-            # Generate PNG
-            pydot_graph.write_png(png_path)
-            
-        except ImportError:
-            print("Graphviz layout requested but pygraphviz or pydot is not installed.")
-            pos = nx.spring_layout(graph)  # Fallback to spring layout
-        except Exception as e:
-            print(f"Error generating graph with pydot: {e}")
-            # Fallback to simple graph
-            try:
-                # Create a simpler pydot graph
-                pydot_graph = nx.nx_pydot.to_pydot(graph)
-                
-                for node in pydot_graph.get_nodes():
-                    node_name = node.get_name().strip('"')
-                    if node_name in graph.nodes:
-                        attrs = graph.nodes[node_name]
-                        node.set_label(f'"{node_name}"')
-                        node.set_shape('box')
-                        
-                        if 'is_selected' in attrs and attrs['is_selected']:
-                            node.set_color('red')
-                            node.set_style('filled')
-                            node.set_fillcolor('red')
-                            node.set_fontcolor('white')
-                
-                pydot_graph.set_rankdir("LR")
-                # Save the fallback DOT file
-                fallback_dot_path = os.path.join(script_dir, "ifc_hierarchy_graph_fallback.dot")
-                pydot_graph.write_raw(fallback_dot_path)
-                pydot_graph.write_png(png_path)
-            except Exception as e2:
-                print(f"Fallback graph generation also failed: {e2}")
-                pos = nx.spring_layout(graph)  # Fallback to spring layout
-                nx.draw(graph, pos, with_labels=True, arrows=True, node_size=2000, 
-                        node_color='lightblue', font_size=10, edge_color='gray')
-                plt.savefig(png_path)
-    return png_path
+_entity_cache = None
 
-def load_image_in_blender(png_path):
-    if "IFCHierarchy" in bpy.data.images:
-        bpy.data.images.remove(bpy.data.images["IFCHierarchy"])
-    img = bpy.data.images.load(png_path)
-    img.name = "IFCHierarchy"
+def get_entity_cache(ifc_file):
+    """Return the entity cache of ifc_file, starting a fresh one when another file was loaded"""
+    global _entity_cache
+    if _entity_cache is None or _entity_cache.ifc_file is not ifc_file:
+        _entity_cache = EntityCache(ifc_file)
+    return _entity_cache
 
-    for area in bpy.context.screen.areas:
-        if area.type == 'IMAGE_EDITOR':
-            area.spaces.active.image = img
-            break
-    else:
-        print("No IMAGE_EDITOR open.")
+def clear_entity_cache():
+    global _entity_cache
+    _entity_cache = None
 
-# --- Blender Operator ---
+# --- Reverse Reference Index ---
 
-class IFC_OT_GenerateHierarchy(bpy.types.Operator):
-    bl_idname = "ifc.generate_hierarchy_graph"
-    bl_label = "Generate IFC Hierarchy"
-    bl_description = "Generate IFC supertypes and subtypes hierarchy graph for selected object"
+# Referrer ids and attribute indices are packed into one unsigned 64 bit value
+ATTRIBUTE_INDEX_BITS = 8
 
-    def execute(self, context):
-        ifc_class = get_selected_ifc_class()
-        if not ifc_class:
-            self.report({'ERROR'}, "No IFC class found for selected object.")
-            return {'CANCELLED'}
+# (attribute index, attribute name) pairs per "SCHEMA.Class" that can hold entity references
+_reference_attributes = {}
 
-        graph = build_ifc_hierarchy_graph(ifc_class)
-        if len(graph.nodes) == 0:
-            self.report({'ERROR'}, "Could not build hierarchy graph.")
-            return {'CANCELLED'}
+def get_reference_attributes(entity):
+    """Return the attributes of entity's class that can reference other entities
 
-        png_path = draw_graph_to_image(graph, title=f"IFC Hierarchy: {ifc_class}", edge_labels=[])
-        load_image_in_blender(png_path)
+    Worked out once per class from the schema, so attributes that only hold
+    values, such as coordinate lists, never need to be decoded.
+    """
+    qualified_class = entity.is_a(True)
+    attributes = _reference_attributes.get(qualified_class)
+    if attributes is None:
+        schema_name, class_name = qualified_class.split(".")
+        declaration = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema_name).declaration_by_name(class_name)
+        attributes = _reference_attributes[qualified_class] = tuple(
+            (attr_index, attribute.name()) for attr_index, attribute in enumerate(declaration.all_attributes())
+            if parameter_type_may_reference(attribute.type_of_attribute()))
+    return attributes
 
-        self.report({'INFO'}, f"Graph generated for {ifc_class}")
-        return {'FINISHED'}
+def parameter_type_may_reference(parameter_type):
+    wrapper = ifcopenshell.ifcopenshell_wrapper
+    if isinstance(parameter_type, wrapper.aggregation_type):
+        return parameter_type_may_reference(parameter_type.type_of_element())
+    if isinstance(parameter_type, wrapper.named_type):
+        return declaration_may_reference(parameter_type.declared_type())
+    return False
 
-class IFC_OT_GenerateAttributeGraph(bpy.types.Operator):
-    bl_idname = "ifc.generate_attribute_graph"
-    bl_label = "Generate Attribute Graph"
-    bl_description = "Generate a graph of all attributes and relationships for the selected IFC entity"
+def declaration_may_reference(declaration):
+    wrapper = ifcopenshell.ifcopenshell_wrapper
+    if isinstance(declaration, wrapper.entity):
+        return True
+    if isinstance(declaration, wrapper.select_type):
+        return any(declaration_may_reference(member) for member in declaration.select_list())
+    if isinstance(declaration, wrapper.type_declaration):
+        return parameter_type_may_reference(declaration.declared_type())
+    return False
 
-    def execute(self, context):
-        ifc_class = get_selected_ifc_class()
-        if not ifc_class:
-            self.report({'ERROR'}, "No IFC class found for selected object.")
-            return {'CANCELLED'}
+def iter_referenced_ids(value):
+    """Yield the ids of all entities referenced by an attribute value, including nested aggregates"""
+    if isinstance(value, ifcopenshell.entity_instance):
+        if value.id():
+            yield value.id()
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_referenced_ids(item)
 
-        ifc_entity = tool.Ifc.get().by_id(int(bpy.context.active_object.BIMObjectProperties.ifc_definition_id))
-        
-        # Get blacklist from user input, splitting by newlines
-        blacklist = [item.strip() for item in context.scene.ifc_graph_blacklist.split('\n') if item.strip()]
-        
-        # Use the user-defined settings from the UI
-        max_depth = context.scene.ifc_graph_max_depth
-        show_inverse = context.scene.ifc_graph_show_inverse
-        show_containment = context.scene.ifc_graph_show_containment
-        show_aggregates = context.scene.ifc_graph_show_aggregates
-        show_defines = context.scene.ifc_graph_show_defines
-        show_material = context.scene.ifc_graph_show_material
-        show_type = context.scene.ifc_graph_show_type
-        
-        graph, edge_labels = build_recursive_attribute_graph(
-            ifc_entity, 
-            blacklist=blacklist, 
-            max_depth=max_depth,
-            show_inverse=show_inverse,
-            show_containment=show_containment,
-            show_aggregates=show_aggregates,
-            show_defines=show_defines,
-            show_material=show_material,
-            show_type=show_type
-        )
-        
-        if len(graph.nodes) == 0:
-            self.report({'ERROR'}, "Could not build attribute graph.")
-            return {'CANCELLED'}
+class ReverseReferenceIndex:
+    """Maps each entity id to the (referrer id, attribute index) pairs pointing at it
 
-        png_path = draw_graph_to_image(graph, edge_labels, title=f"Attributes of {ifc_class}")
-        load_image_in_blender(png_path)
+    Built in a single pass over the file into compressed sparse rows: for
+    target id t, entries[offsets[t]:offsets[t + 1]] holds the packed
+    referrers. References that appear after an edit are kept in a small
+    overlay dict. Entities re-indexed after an edit are remembered in
+    stale_ids, and lookups check that those still point at the target, so
+    rewritten attributes drop out without rebuilding the arrays. Referrers
+    that were never edited are returned without decoding their attributes.
+    """
 
-        self.report({'INFO'}, f"Attribute graph generated for {ifc_class} with depth {max_depth}")
-        return {'FINISHED'}
+    def __init__(self, ifc_file):
+        self.ifc_file = ifc_file
+        self.max_id = ifc_file.get_max_id()
+        self.added = {}
+        self.pending_ids = set()
+        self.stale_ids = set()
+        self.dirty = False
 
-# --- Blender Panel ---
+        targets = array("Q")
+        packed = array("Q")
+        for entity in ifc_file:
+            referrer = entity.id() << ATTRIBUTE_INDEX_BITS
+            for attr_index, _ in get_reference_attributes(entity):
+                for target_id in iter_referenced_ids(entity[attr_index]):
+                    targets.append(target_id)
+                    packed.append(referrer | attr_index)
 
-class IFC_PT_HierarchyPanel(bpy.types.Panel):
-    bl_label = "IFC Class Hierarchy"
-    bl_idname = "IFC_PT_hierarchy_panel"
-    bl_space_type = 'VIEW_3D'
-    bl_region_type = 'UI'
-    bl_category = 'IFC Hierarchy'
+        # Counting sort by target id
+        self.offsets = array("Q", bytes(8 * (self.max_id + 2)))
+        for target_id in targets:
+            self.offsets[target_id + 1] += 1
+        for i in range(1, len(self.offsets)):
+            self.offsets[i] += self.offsets[i - 1]
+        self.entries = array("Q", bytes(8 * len(packed)))
+        fill = array("Q", self.offsets)
+        for target_id, value in zip(targets, packed):
+            self.entries[fill[target_id]] = value
+            fill[target_id] += 1
 
-    def draw(self, context):
-        layout = self.layout
-        
-        # Class hierarchy section
-        box = layout.box()
-        box.label(text="Class Hierarchy")
-        box.operator("ifc.generate_hierarchy_graph", text="Show IFC Class Hierarchy")
-        
-        # Attribute graph section
-        box = layout.box()
-        box.label(text="Attribute Graph")
-        
-        # Add recursion depth control
-        box.prop(context.scene, "ifc_graph_max_depth")
-        box.prop(context.scene, "ifc_graph_show_inverse")
-        
-        # Add blacklist input as a multiline text field
-        box.label(text="Attributes to Exclude:")
+    def add_entity(self, entity):
+        """Record the outgoing references of a created or edited entity"""
+        self.stale_ids.add(entity.id())
+        referrer = entity.id() << ATTRIBUTE_INDEX_BITS
+        for attr_index, _ in get_reference_attributes(entity):
+            for target_id in iter_referenced_ids(entity[attr_index]):
+                packed = referrer | attr_index
+                if packed not in self._candidates(target_id):
+                    self.added.setdefault(target_id, []).append(packed)
+
+    def note_edit(self, settings):
+        """Remember the entities an ifcopenshell.api call was given, they are re-indexed on next use"""
+        for value in settings.values():
+            self.pending_ids.update(iter_referenced_ids(value))
+        self.dirty = True
+
+    def refresh(self):
+        if not self.dirty:
+            return
+        pending_ids, self.pending_ids = self.pending_ids, set()
+        self.dirty = False
+        # Entities created since the last refresh have ids above the last indexed one
+        max_id = self.ifc_file.get_max_id()
+        pending_ids.update(range(self.max_id + 1, max_id + 1))
+        self.max_id = max(self.max_id, max_id)
+        for entity_id in pending_ids:
+            try:
+                entity = self.ifc_file.by_id(entity_id)
+            except RuntimeError:
+                continue
+            self.add_entity(entity)
+            # Usecases also rewrite relationships that point at the entities they were given
+            for referrer in self.ifc_file.get_inverse(entity):
+                self.add_entity(referrer)
+
+    def _candidates(self, target_id):
+        if target_id + 1 < len(self.offsets):
+            candidates = self.entries[self.offsets[target_id]:self.offsets[target_id + 1]].tolist()
+        else:
+            candidates = []
+        return candidates + self.added.get(target_id, [])
+
+    def referrers(self, target_id):
+        """Return (referrer entity, attribute index) pairs that currently reference target_id"""
+        self.refresh()
+        result = []
+        for packed in self._candidates(target_id):
+            referrer_id = packed >> ATTRIBUTE_INDEX_BITS
+            attr_index = packed & ((1 << ATTRIBUTE_INDEX_BITS) - 1)
+            try:
+                referrer = self.ifc_file.by_id(referrer_id)
+            except RuntimeError:
+                continue
+            if referrer_id in self.stale_ids and not (
+                    attr_index < len(referrer) and target_id in iter_referenced_ids(referrer[attr_index])):
+                continue
+            result.append((referrer, attr_index))
+        return result
+
+_reverse_index = None
+
+def get_reverse_index(ifc_file):
+    """Return the reverse reference index of ifc_file, building it on first use"""
+    global _reverse_index
+    if _reverse_index is None or _reverse_index.ifc_file is not ifc_file:
+        _reverse_index = ReverseReferenceIndex(ifc_file)
+    return _reverse_index
+
+# --- IFC Change Handlers ---
+
+def on_ifc_api_edit(usecase_path, ifc_file, settings):
+    """ifcopenshell.api post listener, any edit may rewrite attributes of entities it does not name"""
+    global _last_graph_settings
+    # The relationships in the last graph may be outdated, live updates must not extend it
+    _last_graph_settings = None
+    if _entity_cache is not None and (ifc_file is None or _entity_cache.ifc_file is ifc_file):
+        _entity_cache.invalidate()
+    if _reverse_index is not None and (ifc_file is None or _reverse_index.ifc_file is ifc_file):
+        _reverse_index.note_edit(settings)
+
+@bpy.app.handlers.persistent
+def on_blend_changed(*args):
+    """Forget cached entities when a file is loaded or the IFC model is rolled back by undo/redo"""
+    global _reverse_index, _last_graph_settings, _model_hubs, _model_top_classes, _model_top_referrers
+    clear_entity_cache()
+    _last_graph_settings = None
+    _model_hubs = []
+    _model_top_classes = []
+    _model_top_referrers = []
+    # Undo can recreate deleted entities under their old ids, which refresh() would miss
+    _reverse_index = None
+
+@bpy.app.handlers.persistent
+def on_file_loaded(*args):
+    """Forget node positions, step ids name other entities in the new file"""
+    _layout_positions.clear()
+    subscribe_live_update()
+
+def register_cache_handlers():
+    ifcopenshell.api.add_post_listener("*", "bonsai_graph", on_ifc_api_edit)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if on_blend_changed not in handlers:
+            handlers.append(on_blend_changed)
+    if on_file_loaded not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(on_file_loaded)
+
+def unregister_cache_handlers():
+    ifcopenshell.api.remove_post_listener("*", "bonsai_graph", on_ifc_api_edit)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if on_blend_changed in handlers:
+            handlers.remove(on_blend_changed)
+    if on_file_loaded in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(on_file_loaded)
+    on_blend_changed()
+    _layout_positions.clear()
+
+# --- Relationship Filter ---
+
+# Classes hidden by each relationship toggle of the panel, together with all
+# their subtypes. Classes a schema does not have are skipped, the abstract
+# IFC4 material classes cover the layer, profile and constituent sets.
+RELATIONSHIP_TOGGLE_CLASSES = {
+    "containment": ("IfcRelContainedInSpatialStructure",),
+    "aggregates": ("IfcRelAggregates",),
+    "defines": ("IfcRelDefinesByProperties",),
+    "type": ("IfcRelDefinesByType",),
+    "material": ("IfcRelAssociatesMaterial", "IfcMaterialDefinition", "IfcMaterialUsageDefinition",
+                 "IfcMaterial", "IfcMaterialList", "IfcMaterialLayer", "IfcMaterialLayerSet",
+                 "IfcMaterialLayerSetUsage"),
+}
+
+DEFAULT_FILTER_RULES = ("ObjectPlacement", "PlacementRelTo", "RelativePlacement", "OwnerHistory")
+
+def parse_filter_rules(text):
+    """Split filter rules separated by newlines or commas"""
+    return tuple(rule.strip() for line in text.splitlines() for rule in line.split(",") if rule.strip())
+
+class RelationshipFilter:
+    """Decides which attributes and related entities a graph shows, compiled once per run
+
+    Rules are attribute names hidden on every class, class names hidden with
+    all their subtypes, or "IfcClass.Attribute" to hide an attribute only on
+    a class and its subtypes. Toggles and class rules are resolved through
+    the schema's subtype closure into one set of class names, so checking an
+    edge is a single set lookup.
+    """
+
+    __slots__ = ("hidden_classes", "hidden_attributes", "class_hidden_attributes")
+
+    def __init__(self, index, hidden_toggles=(), rules=()):
+        hidden_roots = [class_name for toggle in hidden_toggles for class_name in RELATIONSHIP_TOGGLE_CLASSES[toggle]]
+        hidden_attributes = set()
+        scoped_rules = []
+        for rule in rules:
+            class_name, _, attr_name = rule.rpartition(".")
+            if class_name:
+                scoped_rules.append((class_name, attr_name))
+            elif index.find(rule) is not None:
+                hidden_roots.append(rule)
+            else:
+                hidden_attributes.add(rule)
+
+        self.hidden_classes = frozenset(index.names[i] for class_name in hidden_roots
+                                        for i in self.class_closure(index, class_name))
+        self.hidden_attributes = frozenset(hidden_attributes)
+        class_hidden_attributes = {}
+        for class_name, attr_name in scoped_rules:
+            closure = self.class_closure(index, class_name)
+            if not closure:
+                print(f"Ignoring filter rule for unknown class: {class_name}.{attr_name}")
+            for i in closure:
+                class_hidden_attributes.setdefault(index.names[i], set(hidden_attributes)).add(attr_name)
+        self.class_hidden_attributes = {name: frozenset(attributes)
+                                        for name, attributes in class_hidden_attributes.items()}
+
+    @staticmethod
+    def class_closure(index, class_name):
+        """Indices of class_name and all its subtypes, empty if the schema lacks it"""
+        i = index.find(class_name)
+        return [] if i is None else [i, *index.descendants[i]]
+
+    def attributes_hidden_on(self, entity_class):
+        return self.class_hidden_attributes.get(entity_class, self.hidden_attributes)
+
+def hidden_toggles(show_containment=True, show_aggregates=True, show_defines=True, show_material=True,
+                   show_type=True):
+    """Tuple of the RELATIONSHIP_TOGGLE_CLASSES keys that are switched off"""
+    toggles = {"containment": show_containment, "aggregates": show_aggregates, "defines": show_defines,
+               "material": show_material, "type": show_type}
+    return tuple(toggle for toggle, shown in toggles.items() if not shown)
+
+@functools.lru_cache(maxsize=8)
+def compile_relationship_filter(schema_name, hidden_toggles, rules):
+    """Return the RelationshipFilter for a schema, a tuple of hidden toggles and a tuple of rules"""
+    return RelationshipFilter(get_class_hierarchy_index(schema_name), hidden_toggles, rules)
+
+# Number of classes listed in a "+N more" summary node before the rest is elided
+SUMMARY_MAX_CLASSES = 5
+# Edge label of the summary node holding the entities that did not fit into the node budget
+NODE_BUDGET_LABEL = "(node budget)"
+
+def build_recursive_attribute_graph(ifc_entity, blacklist=None, max_depth=1, show_inverse=True, 
+                                    show_containment=True, show_aggregates=True, show_defines=True,
+                                    show_material=True, show_type=True, node_budget=0, fanout_limit=0,
+                                    expanded_summaries=(), inverse_depth=1, ifc_file=None, stats=None,
+                                    graph=None):
+    """Build the attribute graph around ifc_entity breadth-first
+
+    ifc_entity may also be a list of entities. They are all roots of one
+    traversal with a single visited set, so the entities they share are
+    expanded and labeled once and the roots are highlighted together.
+    node_budget caps the number of entity nodes and fanout_limit the entities
+    shown per attribute of one entity (0 disables either limit). Related
+    entities beyond the fan-out limit are collapsed into one summary node per
+    attribute, identified by a "<entity id>:<edge label>" summary_key. Every
+    entity whose related entities do not all fit into the node budget
+    collapses the rest into one summary node labeled NODE_BUDGET_LABEL. The
+    budget keeps room for one such node per entity still to be expanded, so
+    entity and budget summary nodes together stay within it. Attributes and
+    entities whose summary_key is in expanded_summaries ignore both limits.
+    Inverse relationships are followed from every entity closer than inverse_depth to
+    a root, the default of 1 only follows those of the roots themselves.
+    blacklist holds RelationshipFilter rules and defaults to the scene's.
+    ifc_file defaults to the file loaded in Bonsai. Inverse lookup times and
+    entity cache hits are recorded in stats if given.
+
+    graph may be the result of an earlier call with the same settings and
+    file. It is extended in place with the neighborhood of the new roots,
+    which replace the highlighted ones. Entities it already expanded are
+    only walked through along their existing edges.
+    """
+    if blacklist is None:
+        # Get the filter rules from the scene settings
+        try:
+            blacklist = parse_filter_rules(bpy.context.scene.ifc_graph_blacklist)
+        except AttributeError:
+            print(f"Could not read the filter rules from the scene, using {DEFAULT_FILTER_RULES}")
+            blacklist = DEFAULT_FILTER_RULES
+    if ifc_file is None:
+        ifc_file = tool.Ifc.get()
+    relationship_filter = compile_relationship_filter(
+        ifc_file.schema, hidden_toggles(show_containment, show_aggregates, show_defines, show_material, show_type),
+        tuple(blacklist))
+    hidden_classes = relationship_filter.hidden_classes
+    # Neighbors of the entities an earlier traversal expanded, by key
+    forward_neighbors = {}
+    inverse_neighbors = {}
+    if graph is None:
+        graph = AttributeGraph(ifc_file)
+    else:
+        graph.selected.clear()
+        # Every edge points from the referencing entity, whichever side it was found from
+        for source_key, target_key, _ in graph.iter_edges():
+            forward_neighbors.setdefault(source_key, []).append(target_key)
+            inverse_neighbors.setdefault(target_key, []).append(source_key)
+    entity_cache = get_entity_cache(ifc_file)
+    cache_hits, cache_misses = entity_cache.hits, entity_cache.misses
+    reverse_index = None
+    if show_inverse:
+        started = time.perf_counter()
+        reverse_index = get_reverse_index(ifc_file)
+        # Bring the index up to date now so the time is not spread over the first lookups
+        reverse_index.refresh()
+        if stats is not None:
+            stats.add_time("inverse lookup", time.perf_counter() - started)
+    
+    # Breadth-first order guarantees the first visit is the shallowest one,
+    # so every entity is expanded at most once. Labels are only rendered when
+    # DOT is emitted.
+    queue = deque()
+    reached = set()
+    # Nodes that count against the node budget are those not in fan-out summaries. Each queued
+    # entity that will be expanded reserves room for its budget summary until it is expanded.
+    fanout_summaries = sum(1 for summary in graph.summaries.values()
+                           if not summary.summary_key.endswith(NODE_BUDGET_LABEL))
+    reserved = 0
+
+    def visit_entity(entity, current_depth):
+        """Add an entity node the first time it is reached and queue it for expansion"""
+        nonlocal reserved
+        entity_key = graph.entity_key(entity)
+        graph.add_node(entity_key)
+        if entity_key not in reached:
+            reached.add(entity_key)
+            queue.append((entity, entity_key, current_depth))
+            if current_depth <= max_depth:
+                reserved += 1
+        return entity_key
+
+    def fits_budget(current_depth):
+        """Whether a new entity related to one at current_depth fits into the node budget"""
+        # An entity that will be expanded also takes the room reserved for its summary
+        cost = 2 if current_depth + 1 <= max_depth else 1
+        return len(graph) - fanout_summaries + reserved + cost <= node_budget
+
+    def revisit_neighbors(neighbor_keys, current_depth):
+        """Walk on through entities an earlier traversal already connected"""
+        for neighbor_key in neighbor_keys:
+            if neighbor_key not in graph.summaries:
+                visit_entity(graph.entity(neighbor_key), current_depth + 1)
+
+    def add_summary_node(entity, entity_key, edge_label, collapsed, inverse):
+        """Collapse related entities that did not fit into one "+N more" node"""
+        class_counts = {}
+        for related_entity in collapsed:
+            related_class = related_entity.is_a()
+            class_counts[related_class] = class_counts.get(related_class, 0) + 1
+        classes = sorted(class_counts.items(), key=lambda item: (-item[1], item[0]))
+        lines = "".join(f"{related_class}: {count}\\l" for related_class, count in classes[:SUMMARY_MAX_CLASSES])
+        if len(classes) > SUMMARY_MAX_CLASSES:
+            lines += f"{len(classes) - SUMMARY_MAX_CLASSES} more classes...\\l"
+
+        summary_name = f"+{len(collapsed)} more {edge_label} of {graph.node_name(entity_key)}"
+        summary_text = f"+{len(collapsed)} more " + ", ".join(related_class for related_class, _ in classes[:3])
+        if len(classes) > 3:
+            summary_text += "..."
+        summary_key = graph.add_summary(SummaryNode(
+            summary_name, f"{{+{len(collapsed)} more|{lines}}}", f"{entity.id()}:{edge_label}", summary_text,
+            array('q', (related_entity.id() for related_entity in collapsed))))
+        if inverse:
+            graph.add_edge(summary_key, entity_key, edge_label)
+        else:
+            graph.add_edge(entity_key, summary_key, edge_label)
+
+    def add_related_entities(entity, entity_key, current_depth, edge_label, related_entities, inverse, budget,
+                             over_budget):
+        """Connect the related entities of one attribute, collapsing those beyond the limits
+
+        Entities beyond the fan-out limit get a summary node of the attribute,
+        those beyond budget are collected in over_budget by id.
+        """
+        nonlocal fanout_summaries
+        limit = fanout_limit
+        if f"{entity.id()}:{edge_label}" in expanded_summaries:
+            limit = budget = 0
+        shown = 0
+        collapsed = []
+        for related_entity in related_entities:
+            if graph.entity_key(related_entity) not in graph:
+                if limit and shown >= limit:
+                    collapsed.append(related_entity)
+                    continue
+                if budget and not fits_budget(current_depth):
+                    over_budget.setdefault(related_entity.id(), related_entity)
+                    continue
+            shown += 1
+            related_entity_key = visit_entity(related_entity, current_depth + 1)
+            if inverse:
+                graph.add_edge(related_entity_key, entity_key, edge_label)
+            else:
+                graph.add_edge(entity_key, related_entity_key, edge_label)
+        if collapsed:
+            fanout_summaries += 1
+            add_summary_node(entity, entity_key, edge_label, collapsed, inverse)
+
+    def expand_entity(entity, entity_key, current_depth):
+        nonlocal reserved
+        budget = 0 if f"{entity.id()}:{NODE_BUDGET_LABEL}" in expanded_summaries else node_budget
+        over_budget = {}
+        expand_relationships(entity, entity_key, current_depth, budget, over_budget)
+        # The summary takes the room this entity reserved
+        reserved -= 1
+        if over_budget:
+            add_summary_node(entity, entity_key, NODE_BUDGET_LABEL, list(over_budget.values()), False)
+
+    def expand_relationships(entity, entity_key, current_depth, budget, over_budget):
+        # Forward relationships from the cached attribute references, grouped by attribute
+        if entity_key in graph.expanded_forward:
+            revisit_neighbors(forward_neighbors.get(entity_key, ()), current_depth)
+        else:
+            graph.expanded_forward.add(entity_key)
+            hidden_attributes = relationship_filter.attributes_hidden_on(entity.is_a())
+            for attr_name, references in groupby(entity_cache.references(entity), key=itemgetter(0)):
+                if attr_name in hidden_attributes:
+                    continue
+                related_entities = [related_entity for _, related_entity in references
+                                    if related_entity.is_a() not in hidden_classes]
+                add_related_entities(entity, entity_key, current_depth, attr_name, related_entities, False, budget,
+                                     over_budget)
+
+        # Inverse relationships from the whole-file reverse reference index
+        if current_depth >= inverse_depth or not show_inverse or entity.is_a() == "IfcOwnerHistory":
+            return
+        if entity_key in graph.expanded_inverse:
+            revisit_neighbors(inverse_neighbors.get(entity_key, ()), current_depth)
+            return
+        graph.expanded_inverse.add(entity_key)
+
+        inverse_entities_by_label = {}
+        started = time.perf_counter()
+        for inverse_entity, inverse_attr_index in reverse_index.referrers(entity.id()):
+            inverse_class = inverse_entity.is_a()
+            if inverse_class in hidden_classes:
+                continue
+            # Lookup attribute name using the single index
+            inverse_attr_name = inverse_entity.attribute_name(inverse_attr_index)
+            # Rules hide an attribute from both of its ends, like in ConnectionSearch.neighbors()
+            if inverse_attr_name in relationship_filter.attributes_hidden_on(inverse_class):
+                continue
+            inverse_entities_by_label.setdefault(f"(inverse) {inverse_attr_name}", []).append(inverse_entity)
+        if stats is not None:
+            stats.add_time("inverse lookup", time.perf_counter() - started)
+
+        for edge_label, inverse_entities in inverse_entities_by_label.items():
+            add_related_entities(entity, entity_key, current_depth, edge_label, inverse_entities, True, budget,
+                                 over_budget)
+
+    for root in (ifc_entity if isinstance(ifc_entity, (list, tuple)) else [ifc_entity]):
+        graph.selected.add(visit_entity(root, 0))
+    while queue:
+        entity, entity_key, current_depth = queue.popleft()
+        # Entities one step beyond max_depth are shown but not expanded
+        if current_depth > max_depth:
+            continue
+        expand_entity(entity, entity_key, current_depth)
+
+    if stats is not None:
+        stats.count("entity cache hits", entity_cache.hits - cache_hits)
+        stats.count("entity cache misses", entity_cache.misses - cache_misses)
+    return graph
+
+# --- Connection Paths ---
+
+# Default for the number of entity expansions a connection search may make, 0 for no limit
+PATH_SEARCH_BUDGET = 200000
+
+class PathSearchBudgetExceeded(Exception):
+    """Raised inside a ConnectionSearch once it expanded more entities than its budget"""
+
+class ConnectionSearch:
+    """Shortest connections between two entities over forward references and inverses
+
+    Entities are step ids and every reference is an edge that can be walked
+    both ways, identified by (referencing id, referenced id, attribute name).
+    relationship_filter hides classes and attributes as in the attribute
+    graph; attribute rules apply to an edge whichever way it is walked.
+    Inline values without an id cannot connect entities and are skipped.
+    """
+
+    def __init__(self, ifc_file, relationship_filter, budget=PATH_SEARCH_BUDGET):
+        self.ifc_file = ifc_file
+        self.relationship_filter = relationship_filter
+        self.budget = budget
+        self.expanded = 0
+        self.budget_exhausted = False
+        self.reverse_index = get_reverse_index(ifc_file)
+        self.reverse_index.refresh()
+        self.neighbor_cache = {}
+
+    def neighbors(self, entity_id):
+        """Return (neighbor id, edge) pairs of entity_id, counting against the budget"""
+        self.expanded += 1
+        if self.budget and self.expanded > self.budget:
+            raise PathSearchBudgetExceeded()
+        neighbors = self.neighbor_cache.get(entity_id)
+        if neighbors is not None:
+            return neighbors
+
+        hidden_classes = self.relationship_filter.hidden_classes
+        entity = self.ifc_file.by_id(entity_id)
+        entity_class = entity.is_a()
+        neighbors = []
+        hidden_attributes = self.relationship_filter.attributes_hidden_on(entity_class)
+        for attr_index, attr_name in get_reference_attributes(entity):
+            if attr_name in hidden_attributes:
+                continue
+            for target_id in iter_referenced_ids(entity[attr_index]):
+                if self.ifc_file.by_id(target_id).is_a() not in hidden_classes:
+                    neighbors.append((target_id, (entity_id, target_id, attr_name)))
+        # Like the attribute graph, do not connect everything through the owner history
+        if entity_class != "IfcOwnerHistory":
+            for referrer, attr_index in self.reverse_index.referrers(entity_id):
+                referrer_class = referrer.is_a()
+                attr_name = referrer.attribute_name(attr_index)
+                if (referrer_class not in hidden_classes
+                        and attr_name not in self.relationship_filter.attributes_hidden_on(referrer_class)):
+                    neighbors.append((referrer.id(), (referrer.id(), entity_id, attr_name)))
+        self.neighbor_cache[entity_id] = neighbors
+        return neighbors
+
+    def shortest_path(self, start_id, goal_id, excluded_nodes=frozenset(), excluded_edges=frozenset()):
+        """Return (node ids, edges) of a shortest path avoiding the excluded ones, or None
+
+        Breadth-first search runs from both ends, always extending the
+        smaller frontier by one full level, and stops at the level where the
+        two searches meet.
+        """
+        if start_id == goal_id:
+            return [start_id], []
+        # Per side, node id -> (previous node id, edge, depth)
+        reached = ({start_id: (None, None, 0)}, {goal_id: (None, None, 0)})
+        frontiers = [[start_id], [goal_id]]
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            own, other = reached[side], reached[1 - side]
+            next_frontier = []
+            best = None
+            for node in frontiers[side]:
+                depth = own[node][2] + 1
+                for neighbor, edge in self.neighbors(node):
+                    if neighbor in excluded_nodes or edge in excluded_edges:
+                        continue
+                    if neighbor in other:
+                        length = depth + other[neighbor][2]
+                        if best is None or length < best[0]:
+                            best = (length, node, neighbor, edge)
+                    elif neighbor not in own:
+                        own[neighbor] = (node, edge, depth)
+                        next_frontier.append(neighbor)
+            if best is not None:
+                _, node, neighbor, edge = best
+                own_nodes, own_edges = self.trace(own, node)
+                other_nodes, other_edges = self.trace(other, neighbor)
+                nodes = own_nodes[::-1] + other_nodes
+                edges = own_edges[::-1] + [edge] + other_edges
+                if side == 1:
+                    nodes.reverse()
+                    edges.reverse()
+                return nodes, edges
+            frontiers[side] = next_frontier
+        return None
+
+    @staticmethod
+    def trace(reached, node):
+        """Nodes and edges from node back to the root of one search side"""
+        nodes = [node]
+        edges = []
+        previous, edge, _ = reached[node]
+        while previous is not None:
+            nodes.append(previous)
+            edges.append(edge)
+            previous, edge, _ = reached[previous]
+        return nodes, edges
+
+    def k_shortest_paths(self, start_id, goal_id, k):
+        """Return up to k loopless paths in order of length, see Yen's algorithm
+
+        Paths that only differ in the attribute of an edge count as different
+        paths. Stops with the paths found so far if the budget runs out, check
+        budget_exhausted afterwards.
+        """
+        self.budget_exhausted = False
+        paths = []
+        try:
+            path = self.shortest_path(start_id, goal_id)
+            if path is None:
+                return paths
+            paths.append(path)
+            seen = {tuple(path[1])}
+            candidates = []
+            while len(paths) < k:
+                last_nodes, last_edges = paths[-1]
+                # Deviate from the last path at each of its nodes in turn
+                for i in range(len(last_nodes) - 1):
+                    root_nodes = last_nodes[:i + 1]
+                    root_edges = last_edges[:i]
+                    excluded_edges = {edges[i] for nodes, edges in paths
+                                      if nodes[:i + 1] == root_nodes and edges[:i] == root_edges}
+                    spur = self.shortest_path(last_nodes[i], goal_id, frozenset(root_nodes[:-1]), excluded_edges)
+                    if spur is None:
+                        continue
+                    edges = root_edges + spur[1]
+                    if tuple(edges) not in seen:
+                        seen.add(tuple(edges))
+                        heapq.heappush(candidates, (len(edges), len(seen), root_nodes[:-1] + spur[0], edges))
+                if not candidates:
+                    break
+                _, _, nodes, edges = heapq.heappop(candidates)
+                paths.append((nodes, edges))
+        except PathSearchBudgetExceeded:
+            self.budget_exhausted = True
+        return paths
+
+def find_connection_paths(start_entity, goal_entity, path_count=1, search_budget=PATH_SEARCH_BUDGET,
+                          blacklist=DEFAULT_FILTER_RULES, show_containment=True, show_aggregates=True,
+                          show_defines=True, show_material=True, show_type=True, ifc_file=None, stats=None):
+    """Return (paths, budget_exhausted) for the path_count shortest connections between two entities
+
+    Each path is a pair of node id and edge lists as returned by
+    ConnectionSearch. The filter settings match build_recursive_attribute_graph.
+    """
+    if ifc_file is None:
+        ifc_file = tool.Ifc.get()
+    relationship_filter = compile_relationship_filter(
+        ifc_file.schema, hidden_toggles(show_containment, show_aggregates, show_defines, show_material, show_type),
+        tuple(blacklist))
+    stats = stats or GraphRunStats()
+    with stats.phase("inverse lookup"):
+        search = ConnectionSearch(ifc_file, relationship_filter, search_budget)
+    with stats.phase("path search"):
+        paths = search.k_shortest_paths(start_entity.id(), goal_entity.id(), path_count)
+    stats.count("expanded entities", search.expanded)
+    stats.count("paths", len(paths))
+    return paths, search.budget_exhausted
+
+def build_path_graph(ifc_file, paths):
+    """Build an attribute graph of the entities and references on paths, selecting both ends"""
+    graph = AttributeGraph(ifc_file)
+    for nodes, edges in paths:
+        for node in nodes:
+            graph.add_node(node)
+        for source_id, target_id, attr_name in edges:
+            graph.add_edge(source_id, target_id, attr_name)
+    if paths:
+        graph.selected.update((paths[0][0][0], paths[0][0][-1]))
+    return graph
+
+# --- Render Cache ---
+
+# Upper bound for the total size of cached renderings on disk
+RENDER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+def get_user_cache_dir(name):
+    """Return a writable per-user directory for the add-on, created on demand"""
+    try:
+        return bpy.utils.extension_path_user(__package__, path=name, create=True)
+    except (AttributeError, ValueError):
+        # Installed as a legacy add-on rather than a Blender 4.2+ extension
+        path = os.path.join(tempfile.gettempdir(), "bonsai_graph", name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+class RenderCache:
+    """Size-bounded LRU store of rendered images keyed by a hash of the DOT text and render settings
+
+    Recency is tracked through file modification times, so the order survives
+    Blender restarts without an index file.
+    """
+
+    def __init__(self, directory, max_bytes=RENDER_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def key(self, dot_text, **settings):
+        digest = hashlib.sha256(dot_text.encode("utf-8"))
+        for name in sorted(settings):
+            digest.update(f"\0{name}={settings[name]}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key, output_format="png"):
+        return os.path.join(self.directory, f"{key}.{output_format}")
+
+    def lookup(self, key, output_format="png"):
+        """Return the bytes of a cached rendering and mark it as recently used, or None"""
+        path = self.path(key, output_format)
+        try:
+            os.utime(path)
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, key, data, output_format="png"):
+        """Write the bytes of a fresh rendering into the cache"""
+        path = self.path(key, output_format)
+        with self.lock:
+            # Batch workers share the cache directory, so the name must be unique across processes
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Delete the least recently used renderings until the cache fits into max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Evicted by another process in the meantime
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            for entry in os.scandir(self.directory):
+                if entry.is_file():
+                    os.remove(entry.path)
+
+_render_cache = None
+
+def get_render_cache():
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = RenderCache(get_user_cache_dir("render_cache"))
+    return _render_cache
+
+class RenderCancelled(Exception):
+    """Raised inside a render job once a newer request or the user cancelled it"""
+
+def run_graphviz(dot_text, job=None, output_format="png", program="dot", graph_attrs=None, extra_args=()):
+    """Pipe DOT source through a Graphviz program and return the rendered bytes
+
+    graph_attrs are passed as -G command line defaults. The process is killed
+    as soon as job gets cancelled.
+    """
+    command = [program, f"-T{output_format}", *extra_args]
+    command.extend(f"-G{name}={value}" for name, value in (graph_attrs or {}).items())
+    process = subprocess.Popen(command, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if job is not None:
+        job.process = process
+    # Input can only be passed on the first call, retries keep collecting output
+    dot_input = dot_text.encode("utf-8")
+    while True:
+        try:
+            output, stderr = process.communicate(input=dot_input, timeout=0.1)
+            break
+        except subprocess.TimeoutExpired:
+            dot_input = None
+            if job is not None and job.cancelled.is_set():
+                process.kill()
+                process.communicate()
+                raise RenderCancelled()
+    if process.returncode != 0:
+        raise RuntimeError(f"{program} exited with {process.returncode}: {stderr.decode(errors='replace').strip()}")
+    return output
+
+# --- Layout Engines ---
+
+# Graphs with more nodes than this get a faster layout than dot with records, 0 disables
+FAST_LAYOUT_NODE_COUNT = 1000
+# Share of nodes that must have a cached position for an incremental layout
+INCREMENTAL_LAYOUT_MIN_KNOWN = 0.5
+LAYOUT_POSITION_CACHE_MAX_NODES = 200000
+
+# Graph attributes per engine, passed on the command line so they do not change the DOT source
+LAYOUT_ENGINE_ATTRIBUTES = {
+    "dot": {},
+    "sfdp": {"overlap": "prism"},
+    # Incremental layouts pin the known nodes, given in points, and place the new ones around them.
+    # neato lets nodes overlap by default, prism moves the new records off the pinned ones
+    "neato": {"inputscale": "72", "notranslate": "true", "splines": "true", "overlap": "prism"},
+}
+
+# Tokens of Graphviz -Tdot output: quoted strings, bare ids and punctuation
+DOT_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s\[\]{};,="]+|[\[\]{};,=]', re.S)
+
+def parse_node_positions(positioned_dot):
+    """Return {node name as escaped in DOT: "x,y"} for the nodes of Graphviz -Tdot output"""
+    positions = {}
+    statement = []
+    # Graphviz breaks long strings with backslash-newline continuations
+    for token in DOT_TOKEN.findall(positioned_dot.replace("\\\n", "")):
+        if token not in (";", "{", "}"):
+            statement.append(token)
+            continue
+        # Node statements are an id followed by attributes, edges have "->" second
+        if len(statement) > 4 and statement[1] == "[" and statement[0] not in ("graph", "node", "edge"):
+            for i in range(2, len(statement) - 2):
+                if statement[i] == "pos" and statement[i + 1] == "=":
+                    positions[statement[0].strip('"')] = statement[i + 2].strip('"!')
+                    break
+        statement = []
+    return positions
+
+class LayoutPositionCache:
+    """Node positions of recent layouts by DOT node name, for later layouts to start from
+
+    Attribute graph nodes are named after the step id of their entity, so a
+    position follows the entity into the next graph it appears in. The least
+    recently laid out nodes are dropped beyond max_nodes.
+    """
+
+    def __init__(self, max_nodes=LAYOUT_POSITION_CACHE_MAX_NODES):
+        self.max_nodes = max_nodes
+        self.positions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def lookup(self, names):
+        with self.lock:
+            return {name: self.positions[name] for name in names if name in self.positions}
+
+    def update(self, positions):
+        with self.lock:
+            for name, position in positions.items():
+                self.positions[name] = position
+                self.positions.move_to_end(name)
+            while len(self.positions) > self.max_nodes:
+                self.positions.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.positions.clear()
+
+_layout_positions = LayoutPositionCache()
+
+class LayoutSettings:
+    """How render_graph lays out graphs
+
+    Graphs with more than fast_layout_nodes nodes are laid out with sfdp
+    ('SFDP') or by dot with plain boxes instead of records ('PLAIN'). With a
+    position_cache, a graph whose nodes were mostly laid out before keeps
+    them in place and only the new nodes are placed, by neato.
+    """
+
+    def __init__(self, fast_layout_nodes=FAST_LAYOUT_NODE_COUNT, fast_layout='SFDP', position_cache=None):
+        self.fast_layout_nodes = fast_layout_nodes
+        self.fast_layout = fast_layout
+        self.position_cache = position_cache
+
+    def engine_for(self, node_count):
+        """Return (engine, plain) for a graph of node_count nodes"""
+        if self.fast_layout_nodes and node_count > self.fast_layout_nodes:
+            if self.fast_layout == 'PLAIN':
+                return "dot", True
+            return "sfdp", False
+        return "dot", False
+
+# --- Resolution and Tiling ---
+
+# Output resolution limits, small graphs get MAX_DPI so zooming in stays sharp
+MAX_DPI = 300
+MIN_READABLE_DPI = 72
+SHARP_NODE_COUNT = 50
+# How far the user can zoom into an image that fits the image editor before it gets blurry
+ZOOM_HEADROOM = 4
+# Edge length in pixels of one tile of a zoom pyramid
+TILE_SIZE = 2048
+DEFAULT_PIXEL_BUDGET = 16 * 1000 * 1000
+
+class GraphLayout:
+    """DOT source with node positions from a finished Graphviz layout
+
+    plain tells whether the nodes are plain boxes, base is the layout that
+    restyle_layout() derived this one from.
+    """
+
+    def __init__(self, positioned_dot, node_count, plain=False, base=None):
+        self.positioned_dot = positioned_dot
+        self.node_count = node_count
+        self.plain = plain
+        self.base = base
+        match = re.search(r'\bbb\s*=\s*"([-\d.e]+),([-\d.e]+),([-\d.e]+),([-\d.e]+)"', positioned_dot)
+        if match is None:
+            raise RuntimeError("Graphviz layout has no bounding box")
+        self.bounding_box = tuple(float(value) for value in match.groups())
+
+    @property
+    def width(self):
+        """Width of the layout in points"""
+        return max(self.bounding_box[2] - self.bounding_box[0], 1.0)
+
+    @property
+    def height(self):
+        return max(self.bounding_box[3] - self.bounding_box[1], 1.0)
+
+    @property
+    def center(self):
+        return ((self.bounding_box[0] + self.bounding_box[2]) / 2, (self.bounding_box[1] + self.bounding_box[3]) / 2)
+
+    def pixels_at(self, dpi):
+        """Pixel count of the image rendered at dpi"""
+        return self.width * dpi / 72 * self.height * dpi / 72
+
+def choose_dpi(layout, view_size=None, pixel_budget=DEFAULT_PIXEL_BUDGET):
+    """Pick the output resolution of a layout, returns (dpi, fits_budget)
+
+    The resolution drops from MAX_DPI as graphs grow and is capped at
+    ZOOM_HEADROOM times what fits the image editor. When even
+    MIN_READABLE_DPI would exceed pixel_budget, the returned dpi renders an
+    overview within the budget and fits_budget is False.
+    """
+    dpi = MAX_DPI * min(1.0, math.sqrt(SHARP_NODE_COUNT / max(layout.node_count, 1)))
+    if view_size:
+        fit_dpi = 72 * min(view_size[0] / layout.width, view_size[1] / layout.height) * ZOOM_HEADROOM
+        dpi = min(dpi, fit_dpi)
+    dpi = max(dpi, MIN_READABLE_DPI)
+
+    budget_dpi = 72 * math.sqrt(pixel_budget / (layout.width * layout.height))
+    if layout.pixels_at(MIN_READABLE_DPI) > pixel_budget:
+        return budget_dpi, False
+    return min(dpi, budget_dpi), True
+
+class TileView:
+    """Position in the zoom pyramid of a graph too large to render at a readable resolution
+
+    Level 0 is the overview rendered within the pixel budget. Each further
+    level doubles the resolution and shows one TILE_SIZE tile around center,
+    which is rendered from the cached layout when the user zooms or pans.
+    """
+
+    def __init__(self, layout, overview_dpi, view_size=None):
+        self.layout = layout
+        self.overview_dpi = overview_dpi
+        self.level = 0
+        self.center = layout.center
+        self.max_level = max(1, math.ceil(math.log2(MAX_DPI / overview_dpi)))
+        width, height = view_size or (TILE_SIZE, TILE_SIZE)
+        self.tile_size = (min(int(width), TILE_SIZE), min(int(height), TILE_SIZE))
+
+    @property
+    def dpi(self):
+        return self.overview_dpi * 2 ** self.level
+
+    def zoom(self, steps):
+        self.level = min(max(self.level + steps, 0), self.max_level)
+
+    def pan(self, dx, dy):
+        """Move by dx, dy half tiles, staying inside the layout"""
+        scale = 72 / self.dpi
+        x = self.center[0] + dx * self.tile_size[0] * scale / 2
+        y = self.center[1] + dy * self.tile_size[1] * scale / 2
+        llx, lly, urx, ury = self.layout.bounding_box
+        self.center = (min(max(x, llx), urx), min(max(y, lly), ury))
+
+    def render_arguments(self):
+        """Return (dpi, viewport or None) of render_layout() for the current tile"""
+        if self.level == 0:
+            return self.overview_dpi, None
+        # The viewport is measured in points at 72 dpi, so Z carries the zoom
+        viewport = f"{self.tile_size[0]},{self.tile_size[1]},{self.dpi / 72:.4f},{self.center[0]:.1f},{self.center[1]:.1f}"
+        return 72, viewport
+
+    def render(self, job=None):
+        dpi, viewport = self.render_arguments()
+        return render_layout(self.layout, dpi, viewport=viewport, job=job)
+
+class GraphImage:
+    """A rendered graph, with its layout and tile view when it was too large to render whole"""
+
+    def __init__(self, png_data, layout=None, dpi=None, tile_view=None):
+        self.png_data = png_data
+        self.layout = layout
+        self.dpi = dpi
+        self.tile_view = tile_view
+
+def layout_graph(graph, job=None, stats=None, layout_settings=None):
+    """Lay out graph once with the engine picked by layout_settings, caching the positioned DOT source
+
+    Layout time is recorded in stats per engine.
+    """
+    stats = stats or GraphRunStats()
+    layout_settings = layout_settings or LayoutSettings()
+    position_cache = layout_settings.position_cache
+    render_cache = get_render_cache()
+    node_count = graph.number_of_nodes()
+    engine, plain = layout_settings.engine_for(node_count)
+    with stats.phase("dot conversion"):
+        dot_text = "".join(iter_dot_lines(graph, plain))
+    cache_key = render_cache.key(dot_text, output_format="dot", layout=engine, **LAYOUT_ENGINE_ATTRIBUTES[engine])
+    positioned_dot = render_cache.lookup(cache_key, output_format="dot")
+
+    # A graph that was not laid out as is, but mostly was before, keeps the known positions
+    if positioned_dot is None and engine == "dot" and not plain and position_cache is not None:
+        positions = position_cache.lookup(dot_quote(graph.node_name(key))[1:-1] for key in graph.keys)
+        if positions and len(positions) >= node_count * INCREMENTAL_LAYOUT_MIN_KNOWN:
+            engine = "neato"
+            stats.count("seeded nodes", len(positions))
+            with stats.phase("dot conversion"):
+                dot_text = "".join(iter_dot_lines(graph, positions=positions))
+            cache_key = render_cache.key(dot_text, output_format="dot", layout=engine,
+                                         **LAYOUT_ENGINE_ATTRIBUTES[engine])
+            positioned_dot = render_cache.lookup(cache_key, output_format="dot")
+
+    with stats.phase(f"layout ({engine})"):
+        if positioned_dot is None:
+            stats.count("render cache misses")
+            if job is not None:
+                job.check_cancelled("Running Graphviz layout")
+            positioned_dot = run_graphviz(dot_text, job, output_format="dot", program=engine,
+                                          graph_attrs=LAYOUT_ENGINE_ATTRIBUTES[engine])
+            render_cache.store(cache_key, positioned_dot, output_format="dot")
+        else:
+            stats.count("render cache hits")
+        layout = GraphLayout(positioned_dot.decode("utf-8"), node_count, plain)
+    if position_cache is not None:
+        position_cache.update(parse_node_positions(layout.positioned_dot))
+    return layout
+
+def render_layout(layout, dpi, viewport=None, job=None, stats=None):
+    """Rasterize a finished layout without laying it out again"""
+    stats = stats or GraphRunStats()
+    graph_attrs = {"dpi": f"{dpi:.2f}"}
+    if viewport is not None:
+        graph_attrs["viewport"] = viewport
+    render_cache = get_render_cache()
+    with stats.phase("rasterization"):
+        cache_key = render_cache.key(layout.positioned_dot, output_format="png", **graph_attrs)
+        png_data = render_cache.lookup(cache_key)
+        if png_data is None:
+            stats.count("render cache misses")
+            if job is not None:
+                job.check_cancelled("Rasterizing")
+            # neato -n2 keeps the node positions and edge splines of the layout
+            png_data = run_graphviz(layout.positioned_dot, job, program="neato", graph_attrs=graph_attrs,
+                                    extra_args=("-n2",))
+            render_cache.store(cache_key, png_data)
+        else:
+            stats.count("render cache hits")
+        return png_data
+
+# --- DOT Output ---
+
+def dot_quote(text):
+    """Quote text as a DOT string, escaping backslashes and double quotes"""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def node_style_attributes(node_style, plain=False):
+    """DOT attributes, with a leading comma, that draw a node of the given CompactGraph.node_style()"""
+    # Highlight the selected nodes
+    if node_style == 'selected':
+        if plain:
+            return ", color=red, style=filled, fillcolor=red, fontcolor=white"
+        return ", color=red, style=filled, fillcolor=lightpink, fontcolor=black"
+    if node_style == 'summary':
+        return ", style=dashed, color=gray40"
+    return ""
+
+# Graphviz defaults of the attributes node_style_attributes() sets
+NODE_STYLE_DEFAULTS = "color=black, style=solid, fontcolor=black"
+
+def restyle_layout(layout, graph):
+    """Return layout with the node styles of graph, which has the same nodes and edges
+
+    Styles do not change the size of nodes, so a new highlight only needs
+    the layout rasterized again. The styles are appended as node statements,
+    which override the attributes Graphviz wrote for the nodes.
+    """
+    base = layout.base or layout
+    lines = [f"{dot_quote(graph.node_name(key))} [{NODE_STYLE_DEFAULTS}"
+             f"{node_style_attributes(graph.node_style(key), base.plain)}];\n" for key in graph.keys]
+    positioned_dot = base.positioned_dot.rstrip()
+    return GraphLayout(positioned_dot[:-1] + "".join(lines) + "}\n", base.node_count, base.plain, base)
+
+def iter_dot_lines(graph, plain=False, positions=None):
+    """Yield the DOT source of an attribute or hierarchy graph line by line
+
+    Nodes are drawn as records using the label of each node, rendered here
+    for attribute graphs, and forward edges leave from the port of the
+    attribute they belong to. With plain set, every node is a box showing
+    only its name, which Graphviz can lay out even when a record label is
+    malformed. Nodes named in positions, as returned by
+    parse_node_positions(), are pinned there.
+    """
+    yield "strict digraph {\n"
+    yield "rankdir=LR;\n"
+    if plain:
+        yield "node [shape=box];\n"
+    else:
+        yield "concentrate=true;\n"  # Merge edges where possible
+        # The resolution is chosen per render, see choose_dpi()
+        yield "graph [fontname=Arial, fontsize=14];\n"
+        yield "node [shape=record, fontname=Arial];\n"
+
+    # Quoted node names by key, each name is emitted once per edge end
+    quoted_names = {}
+    for key in graph.keys:
+        node_name = quoted_names[key] = dot_quote(graph.node_name(key))
+        record_label = None if plain else graph.node_label(key)
+        if record_label is None:
+            label = node_name
+        else:
+            # Record labels are already escaped for DOT by create_dot_node_label
+            label = f'"{record_label}"'
+
+        style = node_style_attributes(graph.node_style(key), plain) + graph.node_attributes(key)
+        if positions is not None:
+            position = positions.get(node_name[1:-1])
+            if position is not None:
+                style += f', pos="{position}!"'
+        yield f"{node_name} [label={label}{style}];\n"
+
+    for source_key, target_key, attr_name in graph.iter_edges():
+        source = quoted_names[source_key]
+        target = quoted_names[target_key]
+        if attr_name is None or plain:
+            yield f"{source} -> {target};\n"
+            continue
+        edge_attrs = f"label={dot_quote(f' {attr_name} ')}"
+        # Connect from the specific attribute port, inverse relationships and
+        # the node budget summary have none
+        if not attr_name.startswith('('):
+            # Make sure attribute name is valid for a port ID (alphanumeric and underscore only)
+            port_name = ''.join(c if c.isalnum() or c == '_' else '_' for c in attr_name)
+            edge_attrs += f", tailport={port_name}"
+        yield f"{source} -> {target} [{edge_attrs}];\n"
+
+    yield "}\n"
+
+def write_dot(graph, stream, plain=False):
+    """Stream the DOT source of graph into a text file or pipe"""
+    for line in iter_dot_lines(graph, plain):
+        stream.write(line)
+
+def render_graph(graph, use_dot_layout=True, job=None, view_size=None,
+                 pixel_budget=DEFAULT_PIXEL_BUDGET, stats=None, layout_settings=None, base_layout=None):
+    """Render graph to a GraphImage in memory, falling back to simpler layouts on failure
+
+    view_size is the (width, height) of the image editor in pixels, used
+    together with the node count and pixel_budget to pick the resolution.
+    layout_settings pick the layout engine, see LayoutSettings. base_layout
+    may be the layout of an earlier rendering with the same nodes and edges,
+    which is reused with the node styles of graph. Phase times and render
+    cache hits are recorded in stats if given.
+    """
+    stats = stats or GraphRunStats()
+    if use_dot_layout:
+        # Use Graphviz's dot layout
+        try:
+            if job is not None:
+                job.check_cancelled("Converting graph")
+            if base_layout is not None:
+                with stats.phase("restyle"):
+                    layout = restyle_layout(base_layout, graph)
+            else:
+                layout = layout_graph(graph, job, stats, layout_settings)
+            dpi, fits_budget = choose_dpi(layout, view_size, pixel_budget)
+            stats.count("dpi", round(dpi))
+            tile_view = None if fits_budget else TileView(layout, dpi, view_size)
+            return GraphImage(render_layout(layout, dpi, job=job, stats=stats), layout, dpi, tile_view)
+            
+        except RenderCancelled:
+            raise
+        except Exception as e:
+            print(f"Error generating graph with Graphviz: {e}")
+            # Fallback to simple graph
+            try:
+                if job is not None:
+                    job.check_cancelled("Running fallback layout")
+                with stats.phase("fallback layout"):
+                    return GraphImage(run_graphviz("".join(iter_dot_lines(graph, plain=True)), job))
+            except RenderCancelled:
+                raise
+            except Exception as e2:
+                print(f"Fallback graph generation also failed: {e2}")
+
+    load_graph_dependencies()
+    import matplotlib.pyplot as plt
+    default_dpi = plt.rcParams['figure.dpi']
+    # Create a Matplotlib figure and axes
+    fig = plt.figure(figsize=(2048/ default_dpi, 2048 / default_dpi), dpi=default_dpi)
+    try:
+        with stats.phase("fallback layout"):
+            graph = graph.to_networkx()
+            pos = nx.spring_layout(graph)  # Fallback to spring layout
+            nx.draw(graph, pos, with_labels=True, arrows=True, node_size=2000, 
+                    node_color='lightblue', font_size=10, edge_color='gray')
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png")
+    finally:
+        # Release the figure, pyplot keeps every open figure alive
+        plt.close(fig)
+    return GraphImage(buffer.getvalue())
+
+def draw_graph_to_image(graph, title="IFC Class Hierarchy", use_dot_layout=True, job=None,
+                        png_path=None, dot_path=None, stats=None, layout_settings=None):
+    """Export graph as a PNG and its DOT source to disk, returning the PNG path"""
+    stats = stats or GraphRunStats(title)
+    # Default to the per-user directory, the add-on directory may be read-only
+    export_dir = None
+    if png_path is None:
+        export_dir = get_user_cache_dir("export")
+        png_path = os.path.join(export_dir, "ifc_hierarchy_graph.png")
+    if dot_path is None:
+        dot_path = os.path.splitext(png_path)[0] + ".dot"
+    
+    print(f"Saving DOT file to: {dot_path}")
+    with stats.phase("dot export"), open(dot_path, "w", encoding="utf-8") as f:
+        write_dot(graph, f)
+    with open(png_path, "wb") as f:
+        f.write(render_graph(graph, use_dot_layout=use_dot_layout, job=job, stats=stats,
+                             layout_settings=layout_settings).png_data)
+    return png_path
+
+def load_image_in_blender(png_data, stats=None):
+    """Show PNG data in the IMAGE_EDITOR through the reused IFCHierarchy image
+
+    Blender decodes the PNG once from memory, the pixels are then copied in
+    bulk and the image is only resized when the graph dimensions change.
+    """
+    import numpy
+
+    with (stats or GraphRunStats()).phase("image load"):
+        decoded = bpy.data.images.new("IFCHierarchy_decode", 1, 1, alpha=True)
+        try:
+            decoded.pack(data=png_data, data_len=len(png_data))
+            decoded.source = 'FILE'
+            width, height = decoded.size
+            pixels = numpy.empty(width * height * 4, dtype=numpy.float32)
+            decoded.pixels.foreach_get(pixels)
+        finally:
+            bpy.data.images.remove(decoded)
+
+        img = bpy.data.images.get("IFCHierarchy")
+        if img is None:
+            img = bpy.data.images.new("IFCHierarchy", width, height, alpha=True)
+        elif tuple(img.size) != (width, height):
+            img.scale(width, height)
+        img.pixels.foreach_set(pixels)
+        img.update()
+
+        for area in iter_screen_areas(bpy.context):
+            if area.type == 'IMAGE_EDITOR':
+                area.spaces.active.image = img
+                break
+        else:
+            print("No IMAGE_EDITOR open.")
+
+# --- Whole-Model Export ---
+
+# File extension per export format
+MODEL_EXPORT_FORMATS = {"GRAPHML": ".graphml", "JSONL": ".jsonl", "BINARY": ".bgel"}
+# Entities between two progress callbacks
+EXPORT_PROGRESS_INTERVAL = 10000
+
+def iter_model_relationships(ifc_file, relationship_filter):
+    """Yield (entity, [(attribute name, target id)]) for every shown entity, in id order
+
+    Uses the same reference attributes as the reverse reference index and
+    the same filter as the attribute graph. Only the references of one
+    entity are held at a time, so memory does not grow with the model.
+    Inline values without an id are not part of the instance graph.
+    """
+    hidden_classes = relationship_filter.hidden_classes
+    for entity_id in range(1, ifc_file.get_max_id() + 1):
+        try:
+            entity = ifc_file.by_id(entity_id)
+        except RuntimeError:
+            continue
+        entity_class = entity.is_a()
+        if entity_class in hidden_classes:
+            continue
+        hidden_attributes = relationship_filter.attributes_hidden_on(entity_class)
+        references = []
+        for attr_index, attr_name in get_reference_attributes(entity):
+            if attr_name in hidden_attributes:
+                continue
+            for target_id in iter_referenced_ids(entity[attr_index]):
+                if not hidden_classes or ifc_file.by_id(target_id).is_a() not in hidden_classes:
+                    references.append((attr_name, target_id))
+        yield entity, references
+
+class GraphMLWriter:
+    """Writes nodes and edges to GraphML as they arrive"""
+
+    def __init__(self, path):
+        self.stream = open(path, "w", encoding="utf-8")
+        self.stream.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            '<key id="class" for="node" attr.name="class" attr.type="string"/>\n'
+            '<key id="global_id" for="node" attr.name="global_id" attr.type="string"/>\n'
+            '<key id="attribute" for="edge" attr.name="attribute" attr.type="string"/>\n'
+            '<graph id="G" edgedefault="directed">\n')
+
+    def node(self, entity_id, entity_class, global_id):
+        data = f'<data key="class">{entity_class}</data>'
+        if global_id:
+            data += f'<data key="global_id">{xml_escape(global_id)}</data>'
+        self.stream.write(f'<node id="n{entity_id}">{data}</node>\n')
+
+    def edge(self, source_id, target_id, attr_name):
+        self.stream.write(f'<edge source="n{source_id}" target="n{target_id}">'
+                          f'<data key="attribute">{attr_name}</data></edge>\n')
+
+    def close(self):
+        self.stream.write("</graph>\n</graphml>\n")
+        self.stream.close()
+
+class JSONLinesWriter:
+    """Writes one JSON object per node and edge"""
+
+    def __init__(self, path):
+        self.stream = open(path, "w", encoding="utf-8")
+
+    def node(self, entity_id, entity_class, global_id):
+        self.stream.write(json.dumps({"node": entity_id, "class": entity_class, "global_id": global_id}) + "\n")
+
+    def edge(self, source_id, target_id, attr_name):
+        self.stream.write(json.dumps({"source": source_id, "target": target_id, "attribute": attr_name}) + "\n")
+
+    def close(self):
+        self.stream.close()
+
+class BinaryEdgeListWriter:
+    """Writes fixed-size little-endian records, with the name tables in a JSON sidecar file
+
+    After the 8 byte header b"BGEL" + uint32 version, a node record is
+    uint8 0, uint32 id, uint16 class and an edge record is uint8 1, uint32
+    source, uint32 target, uint16 attribute. Class and attribute numbers
+    index the "classes" and "attributes" lists of <path>.json.
+    """
+
+    VERSION = 1
+    node_record = struct.Struct("<BIH")
+    edge_record = struct.Struct("<BIIH")
+
+    def __init__(self, path):
+        self.path = path
+        self.stream = open(path, "wb")
+        self.stream.write(b"BGEL" + struct.pack("<I", self.VERSION))
+        self.class_ids = {}
+        self.attribute_ids = {}
+
+    @staticmethod
+    def intern(table, name):
+        name_id = table.get(name)
+        if name_id is None:
+            name_id = table[name] = len(table)
+        return name_id
+
+    def node(self, entity_id, entity_class, global_id):
+        self.stream.write(self.node_record.pack(0, entity_id, self.intern(self.class_ids, entity_class)))
+
+    def edge(self, source_id, target_id, attr_name):
+        self.stream.write(self.edge_record.pack(1, source_id, target_id, self.intern(self.attribute_ids, attr_name)))
+
+    def close(self):
+        self.stream.close()
+        with open(self.path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "classes": list(self.class_ids),
+                       "attributes": list(self.attribute_ids)}, f)
+
+MODEL_EXPORT_WRITERS = {"GRAPHML": GraphMLWriter, "JSONL": JSONLinesWriter, "BINARY": BinaryEdgeListWriter}
+
+def export_model_graph(ifc_file, path, output_format, relationship_filter, progress=None):
+    """Stream the instance graph of the whole model to path, returning (nodes, edges)
+
+    progress is called with the fraction of entity ids processed.
+    """
+    writer = MODEL_EXPORT_WRITERS[output_format](path)
+    nodes = edges = 0
+    max_id = max(ifc_file.get_max_id(), 1)
+    try:
+        for entity, references in iter_model_relationships(ifc_file, relationship_filter):
+            entity_id = entity.id()
+            writer.node(entity_id, entity.is_a(), entity.GlobalId if entity.is_a("IfcRoot") else None)
+            for attr_name, target_id in references:
+                writer.edge(entity_id, target_id, attr_name)
+            nodes += 1
+            edges += len(references)
+            if progress is not None and nodes % EXPORT_PROGRESS_INTERVAL == 0:
+                progress(entity_id / max_id)
+    finally:
+        writer.close()
+    return nodes, edges
+
+# --- Model Statistics ---
+
+# Most referenced entities listed in the panel
+MODEL_HUB_COUNT = 8
+# Most instantiated classes and entities with the most references listed in the panel
+MODEL_TOP_COUNT = 5
+# Graphviz color scheme of the class counts, from pale yellow for few instances to dark red
+CLASS_COUNT_COLOR_SCHEME = "ylorrd9"
+CLASS_COUNT_LEVELS = 9
+
+class ModelStatistics:
+    """Class histogram and reference degrees of one IFC file, collected in a single pass
+
+    The pass only fills flat arrays, which are then turned into numpy arrays
+    indexed by step id: class_indices holds the ClassHierarchyIndex index of
+    each entity's class (-1 for unused ids), in_degree and out_degree the
+    number of references to and from it. Every reference is kept as a target
+    and attribute name id, so hubs can name the attribute most of their
+    referrers use. numpy is only imported here, the add-on does not need it
+    otherwise.
+    """
+
+    def __init__(self, ifc_file):
+        import numpy
+
+        self.ifc_file = ifc_file
+        self.index = get_class_hierarchy_index(ifc_file.schema)
+        max_id = ifc_file.get_max_id()
+        class_indices = array("h", [-1]) * (max_id + 1)
+        sources = array("I")
+        targets = array("I")
+        attribute_ids = array("H")
+        self.attribute_names = []
+        attribute_name_ids = {}
+        class_name_indices = {}
+        for entity in ifc_file:
+            entity_id = entity.id()
+            class_name = entity.is_a()
+            class_index = class_name_indices.get(class_name)
+            if class_index is None:
+                class_index = self.index.find(class_name)
+                class_index = class_name_indices[class_name] = -1 if class_index is None else class_index
+            class_indices[entity_id] = class_index
+            for attr_index, attr_name in get_reference_attributes(entity):
+                attribute_id = attribute_name_ids.get(attr_name)
+                for target_id in iter_referenced_ids(entity[attr_index]):
+                    if attribute_id is None:
+                        attribute_id = attribute_name_ids[attr_name] = len(self.attribute_names)
+                        self.attribute_names.append(attr_name)
+                    sources.append(entity_id)
+                    targets.append(target_id)
+                    attribute_ids.append(attribute_id)
+
+        self.class_indices = numpy.asarray(memoryview(class_indices))
+        self.targets = numpy.asarray(memoryview(targets))
+        self.attribute_ids = numpy.asarray(memoryview(attribute_ids))
+        self.in_degree = numpy.bincount(self.targets, minlength=max_id + 1)
+        self.out_degree = numpy.bincount(numpy.asarray(memoryview(sources)), minlength=max_id + 1)
+        present = self.class_indices[self.class_indices >= 0]
+        self.class_counts = numpy.bincount(present, minlength=len(self.index.names))
+        self.entity_count = len(present)
+        self.reference_count = len(targets)
+
+    def top_classes(self, count):
+        """Return (class name, instances) of the count most instantiated classes"""
+        import numpy
+
+        order = numpy.argsort(-self.class_counts, kind="stable")[:count]
+        return [(self.index.names[i], int(self.class_counts[i])) for i in order.tolist() if self.class_counts[i]]
+
+    def top_referrers(self, count):
+        """Return (entity id, class name, out-degree) of the count entities referencing the most others"""
+        import numpy
+
+        count = min(count, len(self.out_degree))
+        if count == 0:
+            return []
+        candidates = numpy.argpartition(self.out_degree, -count)[-count:]
+        candidates = candidates[numpy.lexsort((candidates, -self.out_degree[candidates]))]
+        return [(entity_id, self.index.names[self.class_indices[entity_id]], int(self.out_degree[entity_id]))
+                for entity_id in candidates.tolist() if self.out_degree[entity_id]]
+
+    def top_hubs(self, count=MODEL_HUB_COUNT):
+        """Return the count most referenced entities, most referenced first
+
+        Each hub is (entity id, class name, in-degree, attribute name, share),
+        where attribute name is the attribute most references to the hub go
+        through and share the fraction of its references that use it.
+        """
+        import numpy
+
+        count = min(count, len(self.in_degree))
+        if count == 0:
+            return []
+        candidates = numpy.argpartition(self.in_degree, -count)[-count:]
+        # Ties in id order, so the list does not change between runs
+        candidates = candidates[numpy.lexsort((candidates, -self.in_degree[candidates]))]
+        hubs = []
+        for entity_id in candidates.tolist():
+            in_degree = int(self.in_degree[entity_id])
+            if in_degree == 0:
+                break
+            attribute_counts = numpy.bincount(self.attribute_ids[self.targets == entity_id])
+            attribute_id = int(attribute_counts.argmax())
+            hubs.append((entity_id, self.index.names[self.class_indices[entity_id]], in_degree,
+                         self.attribute_names[attribute_id], int(attribute_counts[attribute_id]) / in_degree))
+        return hubs
+
+class ClassCountGraph(HierarchyGraph):
+    """Class hierarchy with every class drawn by the number of its instances in a model
+
+    counts holds the instances of each class itself, totals those of the class
+    and all its subtypes. Node size and fill color follow the total on a log
+    scale, so supertypes without instances of their own still show how much
+    of the model lies below them.
+    """
+
+    __slots__ = ("counts", "totals", "max_total")
+
+    def __init__(self, index, counts, totals):
+        super().__init__(index)
+        self.counts = counts
+        self.totals = totals
+        self.max_total = max(totals, default=0)
+
+    def node_label(self, key):
+        count = self.counts[key]
+        total = self.totals[key]
+        if count == total:
+            return f"{self.index.names[key]}\\n{count}"
+        return f"{self.index.names[key]}\\n{count} of {total}"
+
+    def node_attributes(self, key):
+        level = 1
+        if self.max_total > 1:
+            level += round((CLASS_COUNT_LEVELS - 1) * math.log(self.totals[key]) / math.log(self.max_total))
+        fontcolor = "white" if level > CLASS_COUNT_LEVELS - 3 else "black"
+        return (f", style=filled, colorscheme={CLASS_COUNT_COLOR_SCHEME}, fillcolor={level}, "
+                f"fontcolor={fontcolor}, fontsize={10 + 2 * level}")
+
+def build_class_count_graph(statistics):
+    """Hierarchy of the classes instantiated in a model and their supertypes, see ClassCountGraph"""
+    index = statistics.index
+    counts = statistics.class_counts.tolist()
+    instantiated = [i for i, count in enumerate(counts) if count]
+    totals = [0] * len(counts)
+    for i in instantiated:
+        totals[i] += counts[i]
+        for ancestor in index.ancestors[i]:
+            totals[ancestor] += counts[i]
+
+    graph = ClassCountGraph(index, counts, totals)
+    # Like build_ifc_hierarchy_graph, each class is connected to its direct supertype
+    for i in instantiated:
+        graph.add_node(i)
+        child = i
+        for ancestor in index.ancestors[i]:
+            added = graph.add_node(ancestor)
+            graph.add_edge(ancestor, child)
+            if not added:
+                break
+            child = ancestor
+    return graph
+
+# --- Background Rendering ---
+
+class RenderJob:
+    """Runs Graphviz on a worker thread so Blender's UI stays responsive, subclasses implement render()"""
+
+    stages = ("Queued", "Converting graph", "Running Graphviz layout", "Rasterizing", "Running fallback layout")
+
+    def __init__(self, title, stats=None):
+        self.title = title
+        self.stage = "Queued"
+        self.image = None
+        self.stats = stats or GraphRunStats(title)
+        self.error = None
+        self.process = None
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="bonsai_graph_render", daemon=True)
+
+    def render(self):
+        """Return the GraphImage, called on the worker thread"""
+        raise NotImplementedError
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.image = self.render()
+        except RenderCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+
+    def check_cancelled(self, next_stage):
+        if self.cancelled.is_set():
+            raise RenderCancelled()
+        self.stage = next_stage
+
+    def cancel(self):
+        self.cancelled.set()
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    @property
+    def progress(self):
+        """Rough completion fraction derived from the current stage"""
+        return self.stages.index(self.stage) / len(self.stages) if self.stage in self.stages else 0.0
+
+    @property
+    def done(self):
+        return not self.thread.is_alive()
+
+class GraphRenderJob(RenderJob):
+    """Lays out and rasterizes a graph in the background
+
+    The job is created on the main thread, where it takes a GraphSnapshot of
+    the graph. The worker thread only reads the snapshot, never the graph or
+    the IFC file.
+    """
+
+    def __init__(self, graph, title, use_dot_layout=True, view_size=None,
+                 pixel_budget=DEFAULT_PIXEL_BUDGET, stats=None, layout_settings=None, base_layout=None):
+        super().__init__(title, stats)
+        self.graph = graph
+        self.use_dot_layout = use_dot_layout
+        self.view_size = view_size
+        self.pixel_budget = pixel_budget
+        self.layout_settings = layout_settings
+        self.base_layout = base_layout
+        with self.stats.phase("labels"):
+            self.snapshot = GraphSnapshot(graph)
+
+    def render(self):
+        return render_graph(self.snapshot, use_dot_layout=self.use_dot_layout,
+                            job=self, view_size=self.view_size, pixel_budget=self.pixel_budget,
+                            stats=self.stats, layout_settings=self.layout_settings,
+                            base_layout=self.base_layout)
+
+class TileRenderJob(RenderJob):
+    """Rasterizes the current tile of a TileView from its cached layout in the background"""
+
+    def __init__(self, tile_view):
+        super().__init__("Graph tile")
+        self.tile_view = tile_view
+        # Taken now, the tile view may be zoomed or panned again while this renders
+        self.dpi, self.viewport = tile_view.render_arguments()
+
+    def render(self):
+        self.check_cancelled("Rasterizing")
+        png_data = render_layout(self.tile_view.layout, self.dpi, viewport=self.viewport, job=self,
+                                 stats=self.stats)
+        return GraphImage(png_data, self.tile_view.layout, self.dpi, self.tile_view)
+
+_render_job = None
+
+def replace_render_job(job):
+    """Start job in the background, cancelling any render that is still running"""
+    global _render_job
+    if _render_job is not None:
+        _render_job.cancel()
+    # Resolve the cache directory through bpy here, not on the worker thread
+    get_render_cache()
+    _render_job = job
+    job.start()
+    return job
+
+def start_render_job(graph, title, use_dot_layout=True, view_size=None,
+                     pixel_budget=DEFAULT_PIXEL_BUDGET, stats=None, layout_settings=None, base_layout=None):
+    """Start rendering graph in the background, cancelling any render that is still running"""
+    return replace_render_job(GraphRenderJob(graph, title, use_dot_layout, view_size, pixel_budget, stats,
+                                             layout_settings, base_layout))
+
+def get_render_job():
+    """Return the render job that is still running, if any"""
+    if _render_job is not None and not _render_job.done:
+        return _render_job
+    return None
+
+def cancel_render_job():
+    global _render_job
+    if _render_job is not None:
+        _render_job.cancel()
+        _render_job = None
+
+# --- Blender Operator ---
+
+class GraphRenderOperator:
+    """Shared execute/modal logic, subclasses implement build_graph()
+
+    Run from the UI the operator is modal: Graphviz runs in a GraphRenderJob and
+    the image is swapped in once it finishes. Esc cancels, and starting another
+    graph cancels the one still rendering. Called from a script, execute()
+    renders synchronously as before.
+    """
+
+    def build_graph(self, context):
+        """Return (graph, title, finished_message) or None after reporting an error"""
+        raise NotImplementedError
+
+    def prepare_graph(self, context):
+        global _last_graph, _last_graph_settings
+        self.stats = GraphRunStats()
+        # Only attribute graphs set these, so the live update knows when it can extend the graph
+        _last_graph_settings = None
+        with self.stats.phase("traversal"):
+            result = self.build_graph(context)
+        if result is not None:
+            _last_graph = result[0]
+            self.stats.title = result[1]
+            self.stats.count("nodes", result[0].number_of_nodes())
+            self.stats.count("edges", result[0].number_of_edges())
+        return result
+
+    def execute(self, context):
+        result = self.prepare_graph(context)
+        if result is None:
+            return {'CANCELLED'}
+        graph, title, finished_message = result
+
+        cancel_render_job()
+        show_graph_image(render_graph(graph, view_size=get_image_editor_size(context),
+                                      pixel_budget=get_pixel_budget(context), stats=self.stats,
+                                      layout_settings=get_layout_settings(context)), self.stats, graph)
+        record_run_stats(context, self.stats)
+
+        self.report({'INFO'}, finished_message)
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        result = self.prepare_graph(context)
+        if result is None:
+            return {'CANCELLED'}
+        graph, title, self.finished_message = result
+
+        self.job = start_render_job(graph, title, view_size=get_image_editor_size(context),
+                                    pixel_budget=get_pixel_budget(context), stats=self.stats,
+                                    layout_settings=get_layout_settings(context))
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.1, window=context.window)
+        wm.progress_begin(0, 100)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.job.cancel()
+            return self.finish(context, {'WARNING'}, "Graph rendering cancelled.")
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        if self.job.cancelled.is_set():
+            return self.finish(context, {'INFO'}, "Graph rendering superseded or cancelled.")
+
+        if not self.job.done:
+            context.window_manager.progress_update(int(self.job.progress * 100))
+            tag_redraw_panels(context)
+            return {'PASS_THROUGH'}
+
+        if self.job.error is not None:
+            return self.finish(context, {'ERROR'}, f"Graph rendering failed: {self.job.error}")
+
+        show_graph_image(self.job.image, self.job.stats, self.job.graph)
+        record_run_stats(context, self.job.stats)
+        return self.finish(context, {'INFO'}, self.finished_message, result={'FINISHED'})
+
+    def finish(self, context, report_type, message, result=None):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        tag_redraw_panels(context)
+        self.report(report_type, message)
+        return result or {'CANCELLED'}
+
+def iter_screen_areas(context):
+    """Areas of the current screen, or of every window when called from a timer without one"""
+    if context.screen is not None:
+        return context.screen.areas
+    return [area for window in context.window_manager.windows for area in window.screen.areas]
+
+def get_image_editor_size(context):
+    """Size in pixels of the largest open IMAGE_EDITOR, or None"""
+    sizes = [(area.width, area.height) for area in iter_screen_areas(context) if area.type == 'IMAGE_EDITOR']
+    return max(sizes, key=lambda size: size[0] * size[1]) if sizes else None
+
+def get_pixel_budget(context):
+    return int(context.scene.ifc_graph_max_megapixels * 1000 * 1000)
+
+def get_layout_settings(context):
+    scene = context.scene
+    return LayoutSettings(scene.ifc_graph_fast_layout_nodes, scene.ifc_graph_fast_layout,
+                          _layout_positions if scene.ifc_graph_stable_layout else None)
+
+# Zoom pyramid of the graph shown last, if it was too large to render whole
+_tile_view = None
+# The image shown last and (graph, node count, edge count) of the graph it shows
+_last_image = None
+_last_image_graph = None
+
+def show_graph_image(image, stats=None, graph=None):
+    global _tile_view, _last_image, _last_image_graph
+    _tile_view = image.tile_view
+    _last_image = image
+    _last_image_graph = (graph, graph.number_of_nodes(), graph.number_of_edges()) if graph is not None else None
+    load_image_in_blender(image.png_data, stats)
+
+# Timings of the last finished graph run, shown in the panel
+_last_run_stats = None
+
+def record_run_stats(context, stats):
+    """Keep stats for the panel and append them to the timing log if one is configured"""
+    global _last_run_stats
+    stats.finish()
+    _last_run_stats = stats
+    preferences = get_addon_preferences(context)
+    if preferences is not None and preferences.timing_log_path:
+        append_run_log(stats, preferences.timing_log_path)
+
+def get_addon_preferences(context):
+    addon = context.preferences.addons.get(__package__)
+    return addon.preferences if addon is not None else None
+
+def tag_redraw_panels(context):
+    for area in iter_screen_areas(context):
+        if area.type == 'VIEW_3D':
+            area.tag_redraw()
+
+class IFC_OT_GenerateHierarchy(GraphRenderOperator, bpy.types.Operator):
+    bl_idname = "ifc.generate_hierarchy_graph"
+    bl_label = "Generate IFC Hierarchy"
+    bl_description = "Generate IFC supertypes and subtypes hierarchy graph for selected object"
+
+    def build_graph(self, context):
+        ifc_class = get_selected_ifc_class()
+        if not ifc_class:
+            self.report({'ERROR'}, "No IFC class found for selected object.")
+            return None
+
+        graph = build_ifc_hierarchy_graph(ifc_class)
+        if len(graph) == 0:
+            self.report({'ERROR'}, "Could not build hierarchy graph.")
+            return None
+
+        return graph, f"IFC Hierarchy: {ifc_class}", f"Graph generated for {ifc_class}"
+
+def get_attribute_graph_settings(scene):
+    """Keyword arguments for build_recursive_attribute_graph from the panel settings"""
+    return {
+        "blacklist": parse_filter_rules(scene.ifc_graph_blacklist),
+        "max_depth": scene.ifc_graph_max_depth,
+        "show_inverse": scene.ifc_graph_show_inverse,
+        "inverse_depth": scene.ifc_graph_inverse_depth,
+        "show_containment": scene.ifc_graph_show_containment,
+        "show_aggregates": scene.ifc_graph_show_aggregates,
+        "show_defines": scene.ifc_graph_show_defines,
+        "show_material": scene.ifc_graph_show_material,
+        "show_type": scene.ifc_graph_show_type,
+        "node_budget": scene.ifc_graph_node_budget,
+        "fanout_limit": scene.ifc_graph_fanout_limit,
+    }
+
+def build_selection_graph(context, stats=None, graph=None):
+    """Build the attribute graph of the selected IFC objects with the panel settings, returns (graph, roots)
+
+    graph, an earlier attribute graph built with the same settings, is
+    extended instead of starting over, see build_recursive_attribute_graph.
+    """
+    global _expanded_root_ids, _last_graph_settings
+    roots = get_selected_roots(context, tool.Ifc.get())
+
+    # Summary nodes expanded by the user only apply to the graph they were expanded in
+    root_ids = tuple(root.id() for root in roots)
+    if _expanded_root_ids != root_ids:
+        _expanded_root_ids = root_ids
+        _expanded_summaries.clear()
+
+    settings = get_attribute_graph_settings(context.scene)
+    graph = build_recursive_attribute_graph(roots, expanded_summaries=_expanded_summaries, stats=stats,
+                                            graph=graph, **settings)
+    _graph_summaries[:] = [(summary.summary_key, summary.summary_text) for summary in graph.summaries.values()]
+    _last_graph_settings = settings
+    return graph, roots
+
+class IFC_OT_GenerateAttributeGraph(GraphRenderOperator, bpy.types.Operator):
+    bl_idname = "ifc.generate_attribute_graph"
+    bl_label = "Generate Attribute Graph"
+    bl_description = "Generate a graph of all attributes and relationships for the selected IFC entity"
+
+    def build_graph(self, context):
+        ifc_class = get_selected_ifc_class()
+        if not ifc_class:
+            self.report({'ERROR'}, "No IFC class found for selected object.")
+            return None
+
+        graph, roots = build_selection_graph(context, self.stats)
+        max_depth = context.scene.ifc_graph_max_depth
+        
+        if len(graph) == 0:
+            self.report({'ERROR'}, "Could not build attribute graph.")
+            return None
+
+        if len(roots) > 1:
+            return (graph, f"Attributes of {len(roots)} entities",
+                    f"Attribute graph generated for {len(roots)} entities with depth {max_depth}")
+        return (graph, f"Attributes of {ifc_class}",
+                f"Attribute graph generated for {ifc_class} with depth {max_depth}")
+
+class IFC_OT_GenerateConnectionGraph(GraphRenderOperator, bpy.types.Operator):
+    bl_idname = "ifc.generate_connection_graph"
+    bl_label = "Find Connection"
+    bl_description = "Graph the shortest connections from the active IFC object to one other selected IFC object"
+
+    def build_graph(self, context):
+        ifc_file = tool.Ifc.get()
+        if ifc_file is None:
+            self.report({'ERROR'}, "No IFC file loaded.")
+            return None
+
+        active = context.active_object
+        others = [obj for obj in context.selected_objects if obj is not active and get_ifc_definition_id(obj)]
+        if active is None or not get_ifc_definition_id(active) or len(others) != 1:
+            self.report({'ERROR'}, "Select two IFC objects, the connection starts at the active one.")
+            return None
+        start_entity = ifc_file.by_id(get_ifc_definition_id(active))
+        goal_entity = ifc_file.by_id(get_ifc_definition_id(others[0]))
+
+        scene = context.scene
+        paths, budget_exhausted = find_connection_paths(
+            start_entity,
+            goal_entity,
+            path_count=scene.ifc_graph_path_count,
+            search_budget=scene.ifc_graph_path_search_budget,
+            blacklist=parse_filter_rules(scene.ifc_graph_blacklist),
+            show_containment=scene.ifc_graph_show_containment,
+            show_aggregates=scene.ifc_graph_show_aggregates,
+            show_defines=scene.ifc_graph_show_defines,
+            show_material=scene.ifc_graph_show_material,
+            show_type=scene.ifc_graph_show_type,
+            ifc_file=ifc_file,
+            stats=self.stats
+        )
+        if not paths:
+            if budget_exhausted:
+                self.report({'ERROR'}, f"No connection found within the search budget of "
+                                       f"{scene.ifc_graph_path_search_budget} entities.")
+            else:
+                self.report({'ERROR'}, "The objects are not connected with the current filters.")
+            return None
+
+        message = (f"Found {len(paths)} connection(s) from {start_entity.is_a()} to {goal_entity.is_a()}, "
+                   f"the shortest in {len(paths[0][1])} steps")
+        if budget_exhausted:
+            message += ", search budget exhausted"
+        return (build_path_graph(ifc_file, paths), f"Connection: {start_entity.is_a()} to {goal_entity.is_a()}",
+                message)
+
+# Most referenced entities of the last model overview, see ModelStatistics.top_hubs()
+_model_hubs = []
+# Most instantiated classes and widest entities of the last model overview
+_model_top_classes = []
+_model_top_referrers = []
+
+class IFC_OT_GenerateModelStatistics(GraphRenderOperator, bpy.types.Operator):
+    bl_idname = "ifc.generate_model_statistics"
+    bl_label = "Model Overview"
+    bl_description = ("Graph the classes of the loaded IFC model by their number of instances "
+                      "and list its most referenced entities")
+
+    def build_graph(self, context):
+        global _model_hubs, _model_top_classes, _model_top_referrers
+        ifc_file = tool.Ifc.get()
+        if ifc_file is None:
+            self.report({'ERROR'}, "No IFC file loaded.")
+            return None
+
+        statistics = ModelStatistics(ifc_file)
+        _model_hubs = statistics.top_hubs()
+        _model_top_classes = statistics.top_classes(MODEL_TOP_COUNT)
+        _model_top_referrers = statistics.top_referrers(MODEL_TOP_COUNT)
+        self.stats.count("entities", statistics.entity_count)
+        self.stats.count("references", statistics.reference_count)
+        graph = build_class_count_graph(statistics)
+        if len(graph) == 0:
+            self.report({'ERROR'}, "The IFC file has no entities.")
+            return None
+
+        return (graph, f"Model Overview: {statistics.entity_count} entities",
+                f"Counted {statistics.entity_count} entities of {int((statistics.class_counts > 0).sum())} "
+                f"classes with {statistics.reference_count} references")
+
+class IFC_OT_AddGraphFilterRule(bpy.types.Operator):
+    bl_idname = "ifc.add_graph_filter_rule"
+    bl_label = "Exclude From Graphs"
+    bl_description = "Add this attribute to the attributes or classes excluded from attribute graphs"
+
+    rule: bpy.props.StringProperty()
+
+    def execute(self, context):
+        scene = context.scene
+        if self.rule not in parse_filter_rules(scene.ifc_graph_blacklist):
+            text = scene.ifc_graph_blacklist.rstrip()
+            scene.ifc_graph_blacklist = f"{text}\n{self.rule}" if text else self.rule
+        return {'FINISHED'}
+
+# Summary nodes of the last attribute graph as (summary_key, text) pairs, and
+# the summary keys the user expanded for the root entities _expanded_root_ids
+_graph_summaries = []
+_expanded_summaries = set()
+_expanded_root_ids = None
+
+class IFC_OT_ExpandGraphSummary(bpy.types.Operator):
+    bl_idname = "ifc.expand_graph_summary"
+    bl_label = "Expand Summary Node"
+    bl_description = "Show all entities collapsed into this summary node and regenerate the attribute graph"
+
+    summary_key: bpy.props.StringProperty()
+
+    def execute(self, context):
+        _expanded_summaries.add(self.summary_key)
+        bpy.ops.ifc.generate_attribute_graph('INVOKE_DEFAULT')
+        return {'FINISHED'}
+
+# Graph shown last, for exporting it
+_last_graph = None
+# get_attribute_graph_settings() of _last_graph if it is an attribute graph of the selection
+_last_graph_settings = None
+
+class IFC_OT_ExportGraph(bpy.types.Operator, ExportHelper):
+    bl_idname = "ifc.export_graph"
+    bl_label = "Export Graph"
+    bl_description = "Save the graph shown last as a PNG image and its Graphviz DOT source"
+
+    filename_ext = ".png"
+    filter_glob: bpy.props.StringProperty(default="*.png", options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        return _last_graph is not None
+
+    def execute(self, context):
+        png_path = draw_graph_to_image(_last_graph, png_path=self.filepath,
+                                       layout_settings=get_layout_settings(context))
+        self.report({'INFO'}, f"Graph exported to {png_path}")
+        return {'FINISHED'}
+
+class IFC_OT_ExportModelGraph(bpy.types.Operator, ExportHelper):
+    bl_idname = "ifc.export_model_graph"
+    bl_label = "Export Model Graph"
+    bl_description = ("Write the relationships of every entity in the model to a file, "
+                      "using the relationship toggles and exclusions of the panel")
+
+    filename_ext = ".graphml"
+    filter_glob: bpy.props.StringProperty(default="*.graphml;*.jsonl;*.bgel", options={'HIDDEN'})
+    output_format: bpy.props.EnumProperty(name="Format", items=[
+        ('GRAPHML', "GraphML", "XML graph format read by most graph tools"),
+        ('JSONL', "JSON Lines", "One JSON object per node and edge"),
+        ('BINARY', "Binary Edge List", "Fixed-size records with name tables in a .json sidecar file"),
+    ])
+
+    @classmethod
+    def poll(cls, context):
+        return tool.Ifc.get() is not None
+
+    def check(self, context):
+        # Keep the file extension in line with the chosen format
+        filepath = bpy.path.ensure_ext(os.path.splitext(self.filepath)[0], MODEL_EXPORT_FORMATS[self.output_format])
+        changed = filepath != self.filepath
+        self.filepath = filepath
+        return changed
+
+    def execute(self, context):
+        ifc_file = tool.Ifc.get()
+        scene = context.scene
+        relationship_filter = compile_relationship_filter(
+            ifc_file.schema,
+            hidden_toggles(scene.ifc_graph_show_containment, scene.ifc_graph_show_aggregates,
+                           scene.ifc_graph_show_defines, scene.ifc_graph_show_material, scene.ifc_graph_show_type),
+            parse_filter_rules(scene.ifc_graph_blacklist))
+        self.check(context)
+
+        wm = context.window_manager
+        wm.progress_begin(0, 100)
+        try:
+            nodes, edges = export_model_graph(ifc_file, self.filepath, self.output_format, relationship_filter,
+                                              progress=lambda fraction: wm.progress_update(int(fraction * 100)))
+        except OSError as e:
+            self.report({'ERROR'}, f"Could not export model graph: {e}")
+            return {'CANCELLED'}
+        finally:
+            wm.progress_end()
+        self.report({'INFO'}, f"Exported {nodes} entities and {edges} relationships to {self.filepath}")
+        return {'FINISHED'}
+
+class IFC_OT_NavigateGraphTiles(bpy.types.Operator):
+    bl_idname = "ifc.navigate_graph_tiles"
+    bl_label = "Navigate Large Graph"
+    bl_description = "Zoom or pan through a graph that is too large to render at a readable resolution"
+
+    action: bpy.props.EnumProperty(items=[
+        ('ZOOM_IN', "Zoom In", ""),
+        ('ZOOM_OUT', "Zoom Out", ""),
+        ('LEFT', "Left", ""),
+        ('RIGHT', "Right", ""),
+        ('UP', "Up", ""),
+        ('DOWN', "Down", ""),
+    ])
+
+    @classmethod
+    def poll(cls, context):
+        return _tile_view is not None
+
+    def move(self):
+        if self.action == 'ZOOM_IN':
+            _tile_view.zoom(1)
+        elif self.action == 'ZOOM_OUT':
+            _tile_view.zoom(-1)
+        else:
+            dx, dy = {'LEFT': (-1, 0), 'RIGHT': (1, 0), 'UP': (0, 1), 'DOWN': (0, -1)}[self.action]
+            _tile_view.pan(dx, dy)
+
+    def execute(self, context):
+        self.move()
+        try:
+            load_image_in_blender(_tile_view.render())
+        except Exception as e:
+            self.report({'ERROR'}, f"Rendering graph tile failed: {e}")
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        # From the UI the tile is rasterized in the background, like graphs in GraphRenderOperator
+        self.move()
+        self.job = replace_render_job(TileRenderJob(_tile_view))
+        self.timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.job.cancel()
+            return self.finish(context, {'WARNING'}, "Graph tile rendering cancelled.")
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        if self.job.cancelled.is_set():
+            return self.finish(context, {'INFO'}, "Graph tile rendering superseded or cancelled.")
+        if not self.job.done:
+            return {'PASS_THROUGH'}
+        if self.job.error is not None:
+            return self.finish(context, {'ERROR'}, f"Rendering graph tile failed: {self.job.error}")
+        load_image_in_blender(self.job.image.png_data)
+        context.window_manager.event_timer_remove(self.timer)
+        tag_redraw_panels(context)
+        return {'FINISHED'}
+
+    def finish(self, context, report_type, message):
+        context.window_manager.event_timer_remove(self.timer)
+        tag_redraw_panels(context)
+        self.report(report_type, message)
+        return {'CANCELLED'}
+
+class IFC_OT_ClearRenderCache(bpy.types.Operator):
+    bl_idname = "ifc.clear_graph_render_cache"
+    bl_label = "Clear Graph Render Cache"
+    bl_description = "Delete all cached graph renderings from disk"
+
+    def execute(self, context):
+        get_render_cache().clear()
+        self.report({'INFO'}, "Graph render cache cleared.")
+        return {'FINISHED'}
+
+class IFC_OT_CancelGraphRender(bpy.types.Operator):
+    bl_idname = "ifc.cancel_graph_render"
+    bl_label = "Cancel Graph Rendering"
+    bl_description = "Stop the graph that is currently being laid out by Graphviz"
+
+    def execute(self, context):
+        cancel_render_job()
+        return {'FINISHED'}
+
+# --- Live Update ---
+
+# Seconds the selection has to stay put before the graph follows it
+LIVE_UPDATE_DELAY = 0.3
+
+# Owner of the message bus subscription
+_live_update_owner = object()
+# When the pending refresh is due, and the render job of the last refresh
+_live_update_due = 0.0
+_live_update_job = None
+
+def subscribe_live_update():
+    """Follow changes of the active object, Blender drops the subscription whenever a file is loaded"""
+    bpy.msgbus.clear_by_owner(_live_update_owner)
+    bpy.msgbus.subscribe_rna(key=(bpy.types.LayerObjects, "active"), owner=_live_update_owner,
+                             args=(), notify=on_active_object_changed)
+
+def unsubscribe_live_update():
+    bpy.msgbus.clear_by_owner(_live_update_owner)
+    for timer in (live_update_timer, poll_live_update_job):
+        if bpy.app.timers.is_registered(timer):
+            bpy.app.timers.unregister(timer)
+
+def on_active_object_changed(*args):
+    """Restart the delay on every change, the graph of the previous selection is stale now"""
+    global _live_update_due
+    scene = bpy.context.scene
+    if scene is None or not scene.ifc_graph_live_update:
+        return
+    cancel_render_job()
+    _live_update_due = time.perf_counter() + LIVE_UPDATE_DELAY
+    if not bpy.app.timers.is_registered(live_update_timer):
+        bpy.app.timers.register(live_update_timer, first_interval=LIVE_UPDATE_DELAY)
+
+def live_update_timer():
+    remaining = _live_update_due - time.perf_counter()
+    if remaining > 0:
+        return remaining
+    try:
+        refresh_live_graph(bpy.context)
+    except Exception as e:
+        print(f"Live graph update failed: {e}")
+    return None
+
+def refresh_live_graph(context):
+    """Start rendering the attribute graph of the current selection
+
+    When the graph shown was built with the current settings and already
+    contains the selection, a copy of it is extended with the missing
+    neighborhood only. If that adds nothing, its layout is kept and only the
+    highlight is drawn again. Summary nodes depend on what was in the graph
+    when they were made, so when the extended graph has any, it would differ
+    from a graph of the selection alone and the graph is built anew.
+    """
+    global _last_graph, _live_update_job
+    ifc_file = tool.Ifc.get()
+    if ifc_file is None or context.active_object is None or not get_ifc_definition_id(context.active_object):
+        return
+    stats = GraphRunStats()
+    shown_graph = _last_graph
+    if not (isinstance(shown_graph, AttributeGraph) and shown_graph.ifc_file is ifc_file
+            and not shown_graph.summaries
+            and _last_graph_settings == get_attribute_graph_settings(context.scene)
+            and all(shown_graph.entity_key(root) in shown_graph for root in get_selected_roots(context, ifc_file))):
+        shown_graph = None
+
+    with stats.phase("traversal"):
+        # The graph shown stays as it is, a render job may still be reading it
+        graph, roots = build_selection_graph(context, stats, shown_graph.copy() if shown_graph is not None else None)
+        if shown_graph is not None and graph.summaries:
+            shown_graph = None
+            graph, roots = build_selection_graph(context, stats)
+    if len(graph) == 0:
+        return
+    _last_graph = graph
+    stats.title = f"Attributes of {roots[0].is_a()}" if len(roots) == 1 else f"Attributes of {len(roots)} entities"
+    stats.count("nodes", graph.number_of_nodes())
+    stats.count("edges", graph.number_of_edges())
+
+    base_layout = None
+    if (shown_graph is not None and _last_image is not None and _last_image.layout is not None
+            and len(graph.expanded_forward) + len(graph.expanded_inverse)
+            == len(shown_graph.expanded_forward) + len(shown_graph.expanded_inverse)
+            and _last_image_graph == (shown_graph, graph.number_of_nodes(), graph.number_of_edges())):
+        base_layout = _last_image.layout
+
+    _live_update_job = start_render_job(graph, stats.title, view_size=get_image_editor_size(context),
+                                        pixel_budget=get_pixel_budget(context), stats=stats,
+                                        layout_settings=get_layout_settings(context), base_layout=base_layout)
+    if not bpy.app.timers.is_registered(poll_live_update_job):
+        bpy.app.timers.register(poll_live_update_job, first_interval=0.1)
+    tag_redraw_panels(context)
+
+def poll_live_update_job():
+    """Show the image of the live update once it is rendered"""
+    job = _live_update_job
+    if job is None or job.cancelled.is_set():
+        return None
+    if not job.done:
+        return 0.1
+    context = bpy.context
+    if job.error is not None:
+        print(f"Live graph rendering failed: {job.error}")
+    else:
+        show_graph_image(job.image, job.stats, job.graph)
+        record_run_stats(context, job.stats)
+    tag_redraw_panels(context)
+    return None
+
+# --- Blender Panel ---
+
+class IFC_PT_HierarchyPanel(bpy.types.Panel):
+    bl_label = "IFC Class Hierarchy"
+    bl_idname = "IFC_PT_hierarchy_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'IFC Hierarchy'
+
+    def draw(self, context):
+        layout = self.layout
+        
+        # Class hierarchy section
+        box = layout.box()
+        box.label(text="Class Hierarchy")
+        box.operator("ifc.generate_hierarchy_graph", text="Show IFC Class Hierarchy")
+        
+        # Attribute graph section
+        box = layout.box()
+        box.label(text="Attribute Graph")
+        
+        # Add recursion depth control
+        box.prop(context.scene, "ifc_graph_all_selected")
+        box.prop(context.scene, "ifc_graph_max_depth")
+        box.prop(context.scene, "ifc_graph_show_inverse")
+        row = box.row()
+        row.enabled = context.scene.ifc_graph_show_inverse
+        row.prop(context.scene, "ifc_graph_inverse_depth")
+        
+        # Filter rules, separated by commas or newlines
+        box.label(text="Attributes or Classes to Exclude:")
         box.prop(context.scene, "ifc_graph_blacklist", text="")
         
         # Add relationship toggles in a sub-box
@@ -564,26 +3346,189 @@ class IFC_PT_HierarchyPanel(bpy.types.Panel):
         col.prop(context.scene, "ifc_graph_show_defines")
         col.prop(context.scene, "ifc_graph_show_material")
         col.prop(context.scene, "ifc_graph_show_type")
+
+        # Limits for high fan-out relationships
+        col = box.column(align=True)
+        col.prop(context.scene, "ifc_graph_node_budget")
+        col.prop(context.scene, "ifc_graph_fanout_limit")
+        col.prop(context.scene, "ifc_graph_max_megapixels")
+
+        # Layout engine choice for large graphs
+        col = box.column(align=True)
+        col.prop(context.scene, "ifc_graph_stable_layout")
+        row = col.row(align=True)
+        row.prop(context.scene, "ifc_graph_fast_layout_nodes")
+        row.prop(context.scene, "ifc_graph_fast_layout", text="")
         
         # Add the attribute graph button
-        box.operator("ifc.generate_attribute_graph", text="Show Attribute Graph")
+        row = box.row(align=True)
+        row.operator("ifc.generate_attribute_graph", text="Show Attribute Graph")
+        row.prop(context.scene, "ifc_graph_live_update", text="", icon='FILE_REFRESH')
+
+        # Summary nodes of the last graph that can be expanded on demand
+        if _graph_summaries:
+            summary_box = box.box()
+            summary_box.label(text="Collapsed Relationships:")
+            col = summary_box.column(align=True)
+            for summary_key, summary_text in _graph_summaries:
+                col.operator("ifc.expand_graph_summary", text=summary_text, icon='ADD').summary_key = summary_key
+
+        # Shortest connections between two selected objects, with the filters above
+        box = layout.box()
+        box.label(text="Connection Path")
+        row = box.row(align=True)
+        row.prop(context.scene, "ifc_graph_path_count")
+        row.prop(context.scene, "ifc_graph_path_search_budget")
+        box.operator("ifc.generate_connection_graph", text="Show Connection")
+
+        # Where the model is heavy, with the most referenced entities as filter candidates
+        box = layout.box()
+        box.label(text="Model Overview")
+        box.operator("ifc.generate_model_statistics", text="Show Class Counts")
+        if _model_top_classes:
+            box.label(text="Most Instantiated Classes:")
+            col = box.column(align=True)
+            for class_name, instances in _model_top_classes:
+                col.label(text=f"{class_name}: {instances}")
+        if _model_top_referrers:
+            box.label(text="Widest Entities:")
+            col = box.column(align=True)
+            for entity_id, class_name, out_degree in _model_top_referrers:
+                col.label(text=f"#{entity_id} {class_name}: {out_degree} references")
+        if _model_hubs:
+            box.label(text="Most Referenced Entities:")
+            rules = parse_filter_rules(context.scene.ifc_graph_blacklist)
+            col = box.column(align=True)
+            for entity_id, class_name, in_degree, attr_name, share in _model_hubs:
+                row = col.row(align=True)
+                row.label(text=f"#{entity_id} {class_name}: {in_degree}")
+                if attr_name in rules:
+                    row.label(text=f"{attr_name} excluded", icon='CHECKMARK')
+                else:
+                    row.operator("ifc.add_graph_filter_rule", text=f"{attr_name} ({share:.0%})",
+                                 icon='ADD').rule = attr_name
+
+        # Zoom pyramid navigation for graphs beyond the pixel budget
+        if _tile_view is not None:
+            tile_box = layout.box()
+            tile_box.label(text=f"Large graph, zoom level {_tile_view.level}/{_tile_view.max_level}")
+            row = tile_box.row(align=True)
+            row.operator("ifc.navigate_graph_tiles", text="", icon='ZOOM_OUT').action = 'ZOOM_OUT'
+            row.operator("ifc.navigate_graph_tiles", text="", icon='ZOOM_IN').action = 'ZOOM_IN'
+            row.separator()
+            row.operator("ifc.navigate_graph_tiles", text="", icon='TRIA_LEFT').action = 'LEFT'
+            row.operator("ifc.navigate_graph_tiles", text="", icon='TRIA_UP').action = 'UP'
+            row.operator("ifc.navigate_graph_tiles", text="", icon='TRIA_DOWN').action = 'DOWN'
+            row.operator("ifc.navigate_graph_tiles", text="", icon='TRIA_RIGHT').action = 'RIGHT'
+
+        # Progress of a graph that is still being rendered in the background
+        job = get_render_job()
+        if job is not None:
+            row = layout.row()
+            row.label(text=f"Rendering: {job.stage}...", icon='TIME')
+            row.operator("ifc.cancel_graph_render", text="", icon='CANCEL')
+
+        row = layout.row(align=True)
+        row.operator("ifc.export_graph", text="Export...", icon='EXPORT')
+        row.operator("ifc.export_model_graph", text="Export Model...", icon='EXPORT')
+        row.operator("ifc.clear_graph_render_cache", icon='TRASH')
+
+        # Where the time of the last graph went
+        if _last_run_stats is not None:
+            stats_box = layout.box()
+            stats_box.prop(context.scene, "ifc_graph_show_timings",
+                           icon='TRIA_DOWN' if context.scene.ifc_graph_show_timings else 'TRIA_RIGHT',
+                           emboss=False)
+            if context.scene.ifc_graph_show_timings:
+                col = stats_box.column(align=True)
+                for line in _last_run_stats.summary_lines():
+                    col.label(text=line)
+
+# --- Add-on Preferences ---
+
+class IFC_OT_InstallGraphDependencies(bpy.types.Operator):
+    bl_idname = "ifc.install_graph_dependencies"
+    bl_label = "Install Python Packages"
+    bl_description = "Install the Python packages used by Bonsai Graph into the user site-packages with pip"
+
+    packages: bpy.props.StringProperty(default=" ".join(GRAPH_DEPENDENCIES))
+
+    def execute(self, context):
+        if not getattr(bpy.app, "online_access", True):
+            self.report({'ERROR'}, "Online access is disabled in Blender's system preferences.")
+            return {'CANCELLED'}
+        packages = self.packages.split()
+        try:
+            install_packages(packages)
+        except (subprocess.CalledProcessError, OSError) as e:
+            self.report({'ERROR'}, f"Installing {', '.join(packages)} failed: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Installed {', '.join(packages)}")
+        return {'FINISHED'}
+
+class BonsaiGraphPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+
+    timing_log_path: bpy.props.StringProperty(
+        name="Timing Log",
+        description="Append the phase timings of every generated graph to this JSON-lines file, empty to disable",
+        subtype='FILE_PATH'
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "timing_log_path")
+        for title, packages in (("networkx conversion", GRAPH_DEPENDENCIES),
+                                ("Matplotlib fallback renderer", FALLBACK_DEPENDENCIES)):
+            box = layout.box()
+            box.label(text=title)
+            missing = missing_packages(packages)
+            for package in packages:
+                installed = package not in missing
+                box.label(text=f"{package}: {'installed' if installed else 'missing'}",
+                          icon='CHECKMARK' if installed else 'ERROR')
+            if missing:
+                box.operator("ifc.install_graph_dependencies").packages = " ".join(missing)
+        if shutil.which("dot") is None:
+            layout.label(text="Graphviz 'dot' was not found on PATH, see graphviz.org", icon='ERROR')
 
 # --- Registration ---
 
 classes = [
     IFC_OT_GenerateHierarchy,
     IFC_OT_GenerateAttributeGraph,  
+    IFC_OT_GenerateConnectionGraph,
+    IFC_OT_GenerateModelStatistics,
+    IFC_OT_AddGraphFilterRule,
+    IFC_OT_CancelGraphRender,
+    IFC_OT_ExpandGraphSummary,
+    IFC_OT_ExportGraph,
+    IFC_OT_ExportModelGraph,
+    IFC_OT_NavigateGraphTiles,
+    IFC_OT_ClearRenderCache,
+    IFC_OT_InstallGraphDependencies,
+    BonsaiGraphPreferences,
     IFC_PT_HierarchyPanel,
 ]
 
 def register():
     register_properties()
+    register_cache_handlers()
+    subscribe_live_update()
     for cls in classes:
         bpy.utils.register_class(cls)
 
+    elapsed = time.perf_counter() - _import_started
+    if elapsed > REGISTER_TIME_BUDGET:
+        print(f"Bonsai Graph: import and register took {elapsed * 1000:.0f} ms, "
+              f"budget is {REGISTER_TIME_BUDGET * 1000:.0f} ms")
+
 def unregister():
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
+    cancel_render_job()
+    unsubscribe_live_update()
+    unregister_cache_handlers()
     unregister_properties()
 
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+"""Generate attribute graphs for many IFC entities without the Blender UI
+
+Usage, either with plain Python and ifcopenshell or inside Blender:
+
+    python batch.py model.ifc --class IfcWall --out graphs/
+    blender --background --python batch.py -- model.ifc --guid '2O2Fr$t4X7Zf8NOew3FLOH' --out graphs/
+
+Entities are picked by GlobalId and/or IFC class. Traversal and Graphviz
+rendering run in a process pool whose workers open the IFC file once each.
+Every entity gets one output file named after its GlobalId, and
+manifest.json in the output directory summarizes the run.
+
+With --export-model the relationships of the whole model are streamed into
+a single GraphML, JSON-lines or binary edge list file instead:
+
+    python batch.py model.ifc --export-model graphml --out graphs/
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+import headless  # noqa: E402
+
+# Set in each worker process by init_worker()
+_addon = None
+_ifc_file = None
+_settings = None
+_output_format = None
+_layout_settings = None
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate IFC attribute graphs in batch")
+    parser.add_argument("ifc_path", help="IFC file to read")
+    parser.add_argument("--out", required=True, help="Directory for the graphs and manifest.json")
+    parser.add_argument("--guid", action="append", default=[], help="GlobalId of an entity to graph, repeatable")
+    parser.add_argument("--class", dest="ifc_class", action="append", default=[],
+                        help="Graph every entity of this IFC class including subtypes, repeatable")
+    parser.add_argument("--format", choices=("png", "dot"), default="png",
+                        help="Render PNG with Graphviz or only write the DOT source")
+    parser.add_argument("--export-model", choices=("graphml", "jsonl", "binary"),
+                        help="Export the relationships of the whole model to one file instead")
+    parser.add_argument("--fast-layout-nodes", type=int, default=1000,
+                        help="Use the fast layout for graphs with more nodes than this, 0 to always use dot")
+    parser.add_argument("--fast-layout", choices=("sfdp", "plain"), default="sfdp",
+                        help="sfdp layout, or dot with plain boxes instead of records")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--depth", type=int, default=2, help="Maximum recursion depth")
+    parser.add_argument("--inverse-depth", type=int, default=1, help="Follow inverse relationships up to this depth")
+    parser.add_argument("--no-inverse", action="store_true", help="Do not show inverse relationships")
+    parser.add_argument("--blacklist", help="Attributes or classes to exclude separated by commas or newlines, "
+                        "IfcClass.Attribute for one class, defaults to the panel's default rules")
+    parser.add_argument("--node-budget", type=int, default=300, help="Maximum entity nodes, 0 for no limit")
+    parser.add_argument("--fanout-limit", type=int, default=20, help="Maximum entities per attribute, 0 for no limit")
+    for toggle in ("containment", "aggregates", "defines", "material", "type"):
+        parser.add_argument(f"--hide-{toggle}", action="store_true", help=f"Hide {toggle} relationships")
+    return parser.parse_args(argv)
+
+
+def graph_settings(args):
+    """Keyword arguments for build_recursive_attribute_graph matching the panel settings"""
+    addon = headless.load_addon()
+    rules = addon.DEFAULT_FILTER_RULES if args.blacklist is None else addon.parse_filter_rules(args.blacklist)
+    return {
+        "blacklist": list(rules),
+        "max_depth": args.depth,
+        "show_inverse": not args.no_inverse,
+        "inverse_depth": args.inverse_depth,
+        "show_containment": not args.hide_containment,
+        "show_aggregates": not args.hide_aggregates,
+        "show_defines": not args.hide_defines,
+        "show_material": not args.hide_material,
+        "show_type": not args.hide_type,
+        "node_budget": args.node_budget,
+        "fanout_limit": args.fanout_limit,
+    }
+
+
+def init_worker(ifc_path, settings, output_format, fast_layout_nodes, fast_layout):
+    global _addon, _ifc_file, _settings, _output_format, _layout_settings
+    import ifcopenshell
+
+    _addon = headless.load_addon()
+    _ifc_file = ifcopenshell.open(ifc_path)
+    _settings = settings
+    _output_format = output_format
+    # No position cache, every graph gets the same layout whichever worker renders it
+    _layout_settings = _addon.LayoutSettings(fast_layout_nodes, fast_layout.upper())
+
+
+def generate_graph(entity_id, out_dir):
+    """Build and write the graph of one entity, returning its manifest record"""
+    started = time.perf_counter()
+    entity = _ifc_file.by_id(entity_id)
+    global_id = getattr(entity, "GlobalId", None)
+    name = global_id or f"#{entity_id}"
+    record = {"id": entity_id, "global_id": global_id, "class": entity.is_a()}
+    stats = _addon.GraphRunStats(name)
+    try:
+        with stats.phase("traversal"):
+            graph = _addon.build_recursive_attribute_graph(entity, ifc_file=_ifc_file, stats=stats, **_settings)
+        record["nodes"] = graph.number_of_nodes()
+        record["edges"] = graph.number_of_edges()
+        dot_path = os.path.join(out_dir, f"{name}.dot")
+        if _output_format == "dot":
+            with open(dot_path, "w", encoding="utf-8") as f:
+                _addon.write_dot(graph, f)
+            record["output"] = dot_path
+        else:
+            png_path = os.path.join(out_dir, f"{name}.png")
+            record["output"] = _addon.draw_graph_to_image(graph, png_path=png_path, dot_path=dot_path,
+                                                          stats=stats, layout_settings=_layout_settings)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    record["phases"] = {phase: round(seconds, 4) for phase, seconds in stats.phases.items()}
+    record["counters"] = stats.counters
+    return record
+
+
+def select_entity_ids(ifc_path, guids, ifc_classes):
+    """Resolve GlobalIds and class filters to step ids, in file order"""
+    import ifcopenshell
+
+    ifc_file = ifcopenshell.open(ifc_path)
+    entity_ids = []
+    for guid in guids:
+        try:
+            entity_ids.append(ifc_file.by_guid(guid).id())
+        except RuntimeError:
+            print(f"GlobalId not found: {guid}")
+    for ifc_class in ifc_classes:
+        entity_ids.extend(entity.id() for entity in ifc_file.by_type(ifc_class))
+    return sorted(set(entity_ids))
+
+
+def export_model(args, settings):
+    """Stream the whole model graph into the output directory"""
+    import ifcopenshell
+
+    addon = headless.load_addon()
+    started = time.perf_counter()
+    ifc_file = ifcopenshell.open(args.ifc_path)
+    output_format = args.export_model.upper()
+    hidden = addon.hidden_toggles(*(settings[f"show_{toggle}"]
+                                    for toggle in ("containment", "aggregates", "defines", "material", "type")))
+    relationship_filter = addon.compile_relationship_filter(ifc_file.schema, hidden, tuple(settings["blacklist"]))
+    path = os.path.join(args.out, "model" + addon.MODEL_EXPORT_FORMATS[output_format])
+    nodes, edges = addon.export_model_graph(ifc_file, path, output_format, relationship_filter,
+                                            progress=lambda fraction: print(f"{fraction:.0%}"))
+    print(f"Exported {nodes} entities and {edges} relationships to {path} "
+          f"in {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+def run(args):
+    os.makedirs(args.out, exist_ok=True)
+    if args.export_model:
+        return export_model(args, graph_settings(args))
+    if not args.guid and not args.ifc_class:
+        print("Nothing to do, pass --guid and/or --class")
+        return 1
+
+    started = time.perf_counter()
+    entity_ids = select_entity_ids(args.ifc_path, args.guid, args.ifc_class)
+    settings = graph_settings(args)
+    print(f"Generating {len(entity_ids)} graphs with {args.workers} workers")
+
+    records = []
+    # Spawn rather than fork, forking a running Blender is not safe
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker,
+                             initargs=(args.ifc_path, settings, args.format,
+                                       args.fast_layout_nodes, args.fast_layout)) as executor:
+        futures = [executor.submit(generate_graph, entity_id, args.out) for entity_id in entity_ids]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            status = record.get("error") or f"{record['nodes']} nodes"
+            print(f"[{len(records)}/{len(entity_ids)}] #{record['id']} {record['class']}: {status}")
+
+    records.sort(key=lambda record: record["id"])
+    manifest = {
+        "ifc_path": os.path.abspath(args.ifc_path),
+        "format": args.format,
+        "settings": settings,
+        "seconds": round(time.perf_counter() - started, 3),
+        "failed": sum(1 for record in records if "error" in record),
+        "graphs": records,
+    }
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return 1 if manifest["failed"] else 0
+
+
+def main():
+    # Blender passes the script's own arguments after "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    return run(parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
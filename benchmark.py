@@ -0,0 +1,325 @@
+"""Benchmark graph generation on synthetic IFC models of increasing size
+
+Usage, with plain Python and ifcopenshell:
+
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --sizes small,medium --depths 1,2
+
+The models are generated with ifcopenshell from a fixed seed and written to
+--models-dir once, so every run measures the same files. Each model has
+several storeys, property sets and types shared by many elements, and
+triangulated geometry with long coordinate lists. For every model and depth
+the attribute graph traversal (with cold and warm entity caches), label
+formatting and DOT emission are timed, as well as the model statistics
+pass and building the class hierarchy index and graph. Times are the median of --repeat runs; peak
+memory is measured in a separate run with tracemalloc and only covers
+Python allocations, not ifcopenshell's own.
+
+Results can be saved as a baseline and compared in later runs. Cases that
+got slower than the baseline by more than --tolerance (and more than a
+couple of milliseconds) are reported as regressions and make the script exit with status 1.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+import headless  # noqa: E402
+
+# Bump when the generated models change so stale files in --models-dir are not reused
+GENERATOR_VERSION = 1
+
+# name: (storeys, elements per storey, points per face set)
+MODEL_SIZES = {
+    "small": (2, 50, 100),
+    "medium": (10, 200, 500),
+    "large": (40, 500, 2000),
+}
+
+# Property sets every element of a storey shares
+SHARED_PSETS = 4
+ELEMENT_CLASSES = ("IfcWall", "IfcSlab", "IfcColumn", "IfcBeam", "IfcDoor")
+HIERARCHY_CLASSES = ("IfcRoot", "IfcBuildingElement", "IfcWall")
+# Slowdowns smaller than this are timer noise rather than regressions
+NOISE_FLOOR_SECONDS = 0.002
+
+
+def make_guid_factory(seed):
+    rng = random.Random(seed)
+
+    def new_guid():
+        import ifcopenshell.guid
+
+        return ifcopenshell.guid.compress(uuid.UUID(int=rng.getrandbits(128)).hex)
+
+    return new_guid
+
+
+def generate_model(storeys, elements_per_storey, points_per_face_set, seed=0):
+    """Build a synthetic IFC4 model, identical for identical arguments"""
+    import ifcopenshell
+
+    rng = random.Random(seed)
+    new_guid = make_guid_factory(seed)
+    f = ifcopenshell.file(schema="IFC4")
+
+    origin = f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((0.0, 0.0, 0.0)))
+    context = f.createIfcGeometricRepresentationContext(None, "Model", 3, 1.0e-5, origin, None)
+    units = f.createIfcUnitAssignment([f.createIfcSIUnit(None, "LENGTHUNIT", None, "METRE")])
+    project = f.createIfcProject(new_guid(), None, "Benchmark", None, None, None, None, [context], units)
+
+    def placement(relative_to, x=0.0, y=0.0, z=0.0):
+        location = f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((x, y, z)))
+        return f.createIfcLocalPlacement(relative_to, location)
+
+    site = f.createIfcSite(new_guid(), None, "Site", ObjectPlacement=placement(None))
+    building = f.createIfcBuilding(new_guid(), None, "Building", ObjectPlacement=placement(site.ObjectPlacement))
+    f.createIfcRelAggregates(new_guid(), None, None, None, project, [site])
+    f.createIfcRelAggregates(new_guid(), None, None, None, site, [building])
+
+    # Shared types, each with a material
+    types = {}
+    for ifc_class in ELEMENT_CLASSES:
+        element_type = f.create_entity(f"{ifc_class}Type", new_guid(), None, f"{ifc_class} type",
+                                       PredefinedType="NOTDEFINED")
+        material = f.createIfcMaterial(f"{ifc_class} material")
+        f.createIfcRelAssociatesMaterial(new_guid(), None, None, None, [element_type], material)
+        types[ifc_class] = element_type
+
+    # Shared property sets
+    psets = []
+    for pset_index in range(SHARED_PSETS):
+        properties = [f.createIfcPropertySingleValue(f"Property{i}", None, f.createIfcLabel(f"Value {pset_index}.{i}"), None)
+                      for i in range(8)]
+        psets.append(f.createIfcPropertySet(new_guid(), None, f"Pset_Benchmark{pset_index}", None, properties))
+
+    storey_entities = []
+    elements_by_type = {ifc_class: [] for ifc_class in ELEMENT_CLASSES}
+    for storey_index in range(storeys):
+        storey = f.createIfcBuildingStorey(new_guid(), None, f"Storey {storey_index}",
+                                           ObjectPlacement=placement(building.ObjectPlacement, z=3.0 * storey_index),
+                                           Elevation=3.0 * storey_index)
+        storey_entities.append(storey)
+        elements = []
+        for element_index in range(elements_per_storey):
+            ifc_class = ELEMENT_CLASSES[element_index % len(ELEMENT_CLASSES)]
+            coordinates = [(rng.uniform(0, 10), rng.uniform(0, 10), rng.uniform(0, 3))
+                           for _ in range(points_per_face_set)]
+            triangles = [(i, i + 1, i + 2) for i in range(1, points_per_face_set - 1)]
+            face_set = f.createIfcTriangulatedFaceSet(f.createIfcCartesianPointList3D(coordinates), None, True,
+                                                      triangles, None)
+            shape = f.createIfcShapeRepresentation(context, "Body", "Tessellation", [face_set])
+            element = f.create_entity(ifc_class, new_guid(), None, f"{ifc_class} {storey_index}.{element_index}",
+                                      ObjectPlacement=placement(storey.ObjectPlacement, x=float(element_index)),
+                                      Representation=f.createIfcProductDefinitionShape(None, None, [shape]))
+            elements.append(element)
+            elements_by_type[ifc_class].append(element)
+        f.createIfcRelContainedInSpatialStructure(new_guid(), None, None, None, elements, storey)
+        for pset in psets:
+            f.createIfcRelDefinesByProperties(new_guid(), None, None, None, elements, pset)
+
+    f.createIfcRelAggregates(new_guid(), None, None, None, building, storey_entities)
+    for ifc_class, elements in elements_by_type.items():
+        if elements:
+            f.createIfcRelDefinesByType(new_guid(), None, None, None, elements, types[ifc_class])
+    return f
+
+
+def get_model_path(models_dir, size):
+    storeys, elements_per_storey, points = MODEL_SIZES[size]
+    path = os.path.join(models_dir, f"benchmark_v{GENERATOR_VERSION}_{storeys}x{elements_per_storey}x{points}.ifc")
+    if not os.path.exists(path):
+        print(f"Generating {size} model: {path}")
+        os.makedirs(models_dir, exist_ok=True)
+        generate_model(storeys, elements_per_storey, points).write(path)
+    return path
+
+
+def measure(function, repeat, setup=None):
+    """Return (median seconds, peak traced bytes, result of the last call)"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - started)
+
+    # Memory is traced in a separate call, tracemalloc slows everything down
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def run_model_cases(addon, ifc_file, size, depths, settings, repeat):
+    # An element in the middle storey, related to everything through shared psets and types
+    elements = ifc_file.by_type("IfcWall")
+    root = elements[len(elements) // 2]
+    results = []
+
+    def record(case, depth, seconds, peak, **extra):
+        result = {"case": case, "size": size, "depth": depth, "seconds": round(seconds, 6),
+                  "peak_mib": round(peak / 2 ** 20, 3), **extra}
+        results.append(result)
+        print(f"{size:>8} {case:<18} depth {depth if depth is not None else '-':<3}"
+              f"{seconds * 1000:10.1f} ms {result['peak_mib']:9.2f} MiB")
+
+    for depth in depths:
+        def traverse():
+            return addon.build_recursive_attribute_graph(root, max_depth=depth, ifc_file=ifc_file, **settings)
+
+        seconds, peak, graph = measure(traverse, repeat, setup=addon.on_blend_changed)
+        size_info = {"nodes": graph.number_of_nodes(), "edges": graph.number_of_edges()}
+        record("traversal cold", depth, seconds, peak, **size_info)
+        seconds, peak, _ = measure(traverse, repeat)
+        record("traversal warm", depth, seconds, peak, **size_info)
+
+        entities = graph.entities()
+        seconds, peak, _ = measure(lambda: [addon.create_dot_node_label(entity) for entity in entities], repeat)
+        record("labels", depth, seconds, peak, nodes=len(entities))
+
+        seconds, peak, _ = measure(lambda: "".join(addon.iter_dot_lines(graph)), repeat)
+        record("dot emission", depth, seconds, peak, **size_info)
+
+    seconds, peak, model_statistics = measure(lambda: addon.ModelStatistics(ifc_file), repeat)
+    record("model statistics", None, seconds, peak, references=model_statistics.reference_count)
+
+    results.append({"case": "entities", "size": size, "depth": None, "count": len(list(ifc_file))})
+    return results
+
+
+def run_hierarchy_cases(addon, schema_name, repeat):
+    results = []
+    seconds, peak, index = measure(lambda: addon.ClassHierarchyIndex.from_schema(schema_name), repeat)
+    results.append({"case": "hierarchy index", "size": schema_name, "depth": None,
+                    "seconds": round(seconds, 6), "peak_mib": round(peak / 2 ** 20, 3), "classes": len(index.names)})
+    for ifc_class in HIERARCHY_CLASSES:
+        seconds, peak, graph = measure(lambda: addon.build_ifc_hierarchy_graph(ifc_class, schema_name), repeat)
+        results.append({"case": f"hierarchy {ifc_class}", "size": schema_name, "depth": None,
+                        "seconds": round(seconds, 6), "peak_mib": round(peak / 2 ** 20, 3),
+                        "nodes": graph.number_of_nodes()})
+    for result in results:
+        print(f"{result['size']:>8} {result['case']:<30}{result['seconds'] * 1000:10.1f} ms "
+              f"{result['peak_mib']:9.2f} MiB")
+    return results
+
+
+def result_key(result):
+    return (result["case"], result["size"], result["depth"])
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Print the change against the baseline per case, returning the number of regressions"""
+    baseline_results = {result_key(result): result for result in baseline["results"]}
+    regressions = 0
+    print("\nCompared with baseline:")
+    for result in results:
+        previous = baseline_results.get(result_key(result))
+        if previous is None or "seconds" not in result or not previous.get("seconds"):
+            continue
+        ratio = result["seconds"] / previous["seconds"]
+        status = ""
+        if ratio > 1 + tolerance and result["seconds"] - previous["seconds"] > NOISE_FLOOR_SECONDS:
+            status = "REGRESSION"
+            regressions += 1
+        elif ratio < 1 - tolerance:
+            status = "faster"
+        if result.get("nodes") != previous.get("nodes"):
+            # Timing a different graph says little about speed
+            status += f" (nodes {previous.get('nodes')} -> {result.get('nodes')})"
+        case, size, depth = result_key(result)
+        print(f"{size:>8} {case:<30} depth {depth if depth is not None else '-':<3}{ratio:7.2f}x {status}")
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark IFC graph generation on synthetic models")
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"Comma separated model sizes out of {', '.join(MODEL_SIZES)}")
+    parser.add_argument("--depths", default="1,2,3", help="Comma separated traversal depths")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case, the median is reported")
+    parser.add_argument("--models-dir", default=os.path.join(tempfile.gettempdir(), "bonsai_graph", "benchmark"),
+                        help="Directory for the generated IFC models")
+    parser.add_argument("--node-budget", type=int, default=300, help="Maximum entity nodes, 0 for no limit")
+    parser.add_argument("--fanout-limit", type=int, default=20, help="Maximum entities per attribute, 0 for no limit")
+    parser.add_argument("--inverse-depth", type=int, default=1, help="Follow inverse relationships up to this depth")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", help="Write the results as the new baseline to this file")
+    parser.add_argument("--baseline", help="Compare the results with this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative slowdown against the baseline reported as a regression")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    import ifcopenshell
+
+    addon = headless.load_addon()
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in MODEL_SIZES]
+    if unknown:
+        print(f"Unknown model sizes: {', '.join(unknown)}")
+        return 2
+    depths = [int(depth) for depth in args.depths.split(",") if depth.strip()]
+    settings = {
+        "blacklist": list(addon.DEFAULT_FILTER_RULES),
+        "node_budget": args.node_budget,
+        "fanout_limit": args.fanout_limit,
+        "inverse_depth": args.inverse_depth,
+    }
+
+    results = []
+    for size in sizes:
+        ifc_file = ifcopenshell.open(get_model_path(args.models_dir, size))
+        results.extend(run_model_cases(addon, ifc_file, size, depths, settings, args.repeat))
+        addon.on_blend_changed()
+    results.extend(run_hierarchy_cases(addon, "IFC4", args.repeat))
+
+    report = {
+        "generator_version": GENERATOR_VERSION,
+        "python": sys.version.split()[0],
+        "ifcopenshell": getattr(ifcopenshell, "version", None),
+        "settings": settings,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("generator_version") != GENERATOR_VERSION:
+            print("Baseline was measured on different models, comparison skipped")
+            return 0
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{regressions} regressions beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+def main():
+    return run(parse_args(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Load the Bonsai Graph add-on module outside of Blender's UI
+
+The graph traversal and DOT output only need ifcopenshell, but the add-on
+module also defines operators and panels, so importing it requires bpy and
+bonsai.tool. Inside `blender --background` the real modules are used. In a
+plain Python interpreter minimal stand-ins are installed that provide just
+enough for the module to import; anything that really needs Blender, such as
+loading images or reading scene settings, is unavailable there.
+"""
+
+import importlib.util
+import os
+import sys
+import types
+
+ADDON_DIR = os.path.dirname(os.path.realpath(__file__))
+ADDON_MODULE_NAME = "bonsai_graph_headless"
+
+
+def install_shims():
+    """Install stand-ins for bpy and bonsai.tool if they cannot be imported"""
+    try:
+        import bpy  # noqa: F401
+    except ImportError:
+        sys.modules["bpy"] = make_bpy_shim()
+        bpy_extras = types.ModuleType("bpy_extras")
+        bpy_extras.io_utils = types.ModuleType("bpy_extras.io_utils")
+        bpy_extras.io_utils.ExportHelper = type("ExportHelper", (), {})
+        sys.modules["bpy_extras"] = bpy_extras
+        sys.modules["bpy_extras.io_utils"] = bpy_extras.io_utils
+
+    try:
+        import bonsai.tool  # noqa: F401
+    except ImportError:
+        bonsai = types.ModuleType("bonsai")
+        bonsai.tool = make_bonsai_tool_shim()
+        sys.modules["bonsai"] = bonsai
+        sys.modules["bonsai.tool"] = bonsai.tool
+
+
+def make_bpy_shim():
+    bpy = types.ModuleType("bpy")
+
+    class StructBase:
+        pass
+
+    bpy.types = types.SimpleNamespace(
+        Operator=type("Operator", (StructBase,), {}),
+        Panel=type("Panel", (StructBase,), {}),
+        AddonPreferences=type("AddonPreferences", (StructBase,), {}),
+        PropertyGroup=type("PropertyGroup", (StructBase,), {}),
+        UIList=type("UIList", (StructBase,), {}),
+        Scene=type("Scene", (StructBase,), {}),
+    )
+
+    class Props:
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: None
+
+    def extension_path_user(package, path="", create=False):
+        raise ValueError("Not running as a Blender extension")
+
+    bpy.props = Props()
+    bpy.context = types.SimpleNamespace(scene=None, screen=None)
+    bpy.utils = types.SimpleNamespace(
+        register_class=lambda cls: None,
+        unregister_class=lambda cls: None,
+        extension_path_user=extension_path_user,
+    )
+    bpy.app = types.SimpleNamespace(
+        background=True,
+        online_access=False,
+        handlers=types.SimpleNamespace(
+            load_post=[], undo_post=[], redo_post=[], depsgraph_update_post=[], persistent=lambda f: f
+        ),
+    )
+    return bpy
+
+
+def make_bonsai_tool_shim():
+    tool = types.ModuleType("bonsai.tool")
+
+    class Ifc:
+        """Holds the file opened by the headless caller in place of Bonsai's loaded project"""
+
+        file = None
+
+        @classmethod
+        def get(cls):
+            return cls.file
+
+        @classmethod
+        def set(cls, ifc_file):
+            cls.file = ifc_file
+
+    tool.Ifc = Ifc
+    return tool
+
+
+def load_addon():
+    """Import the add-on's __init__.py as a module without registering it"""
+    module = sys.modules.get(ADDON_MODULE_NAME)
+    if module is not None:
+        return module
+    install_shims()
+    spec = importlib.util.spec_from_file_location(
+        ADDON_MODULE_NAME, os.path.join(ADDON_DIR, "__init__.py"), submodule_search_locations=[ADDON_DIR]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[ADDON_MODULE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,38 @@
+"""Add-on module and test models shared by the tests
+
+The tests run outside Blender through headless.py:
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+try:
+    import ifcopenshell
+except ImportError:
+    ifcopenshell = None
+
+addon = None
+if ifcopenshell is not None:
+    import benchmark
+    import headless
+
+    addon = headless.load_addon()
+
+requires_ifcopenshell = unittest.skipIf(ifcopenshell is None, "ifcopenshell is not installed")
+
+
+def make_model():
+    """A small model from benchmark.generate_model(), with fresh add-on caches"""
+    addon.on_blend_changed()
+    return benchmark.generate_model(storeys=2, elements_per_storey=6, points_per_face_set=4)
+
+
+def forward_ids(entity, hidden_attributes=()):
+    for attr_index, attr_name in addon.get_reference_attributes(entity):
+        if attr_name not in hidden_attributes:
+            yield from addon.iter_referenced_ids(entity[attr_index])
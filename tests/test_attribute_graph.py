@@ -0,0 +1,126 @@
+"""Checks of build_recursive_attribute_graph on small generated models"""
+
+import unittest
+from collections import deque
+from unittest import mock
+
+from common import addon, forward_ids, ifcopenshell, make_model, requires_ifcopenshell
+
+
+def make_tree(width):
+    """A property set with width complex properties of width single values each, and nothing else"""
+    addon.on_blend_changed()
+    ifc_file = ifcopenshell.file(schema="IFC4")
+    complex_properties = [
+        ifc_file.createIfcComplexProperty(f"Complex{i}", None, f"Usage{i}", [
+            ifc_file.createIfcPropertySingleValue(f"Single{i}.{j}", None, None, None) for j in range(width)])
+        for i in range(width)]
+    root = ifc_file.createIfcPropertySet(ifcopenshell.guid.new(), None, "Pset_Tree", None, complex_properties)
+    return ifc_file, root
+
+
+@requires_ifcopenshell
+class AttributeGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.ifc_file = make_model()
+        self.root = self.ifc_file.by_type("IfcWall")[0]
+
+    def build(self, root=None, **settings):
+        settings = {"blacklist": [], "ifc_file": self.ifc_file, **settings}
+        return addon.build_recursive_attribute_graph(root or self.root, **settings)
+
+    def summaries_by_key(self, graph):
+        return {summary.summary_key: summary for summary in graph.summaries.values()}
+
+    def assert_nothing_dropped(self, graph):
+        """Every expanded entity shows each forward reference as a node or in one of its summaries"""
+        collapsed = {}
+        for summary in graph.summaries.values():
+            entity_id = int(summary.summary_key.split(":")[0])
+            collapsed.setdefault(entity_id, set()).update(summary.collapsed_ids)
+        for entity_id in graph.expanded_forward:
+            entity = self.ifc_file.by_id(entity_id)
+            for target_id in forward_ids(entity):
+                self.assertTrue(target_id in graph or target_id in collapsed.get(entity_id, ()),
+                                f"#{target_id} of {entity} is missing")
+
+    def test_forward_depth(self):
+        # Entities up to one step beyond max_depth are shown
+        for max_depth in (1, 2, 3):
+            graph = self.build(max_depth=max_depth, show_inverse=False)
+            depths = {self.root.id(): 0}
+            queue = deque([self.root])
+            while queue:
+                entity = queue.popleft()
+                if depths[entity.id()] > max_depth:
+                    continue
+                for target_id in forward_ids(entity):
+                    if target_id not in depths:
+                        depths[target_id] = depths[entity.id()] + 1
+                        queue.append(self.ifc_file.by_id(target_id))
+            self.assertEqual({key for key in graph.keys if key > 0}, set(depths))
+
+    def test_fanout_limit(self):
+        storey = self.ifc_file.by_type("IfcBuildingStorey")[0]
+        contained = self.ifc_file.by_type("IfcRelContainedInSpatialStructure")[0]
+        summary_key = f"{contained.id()}:RelatedElements"
+        graph = self.build(storey, max_depth=2, fanout_limit=2)
+        self.assertEqual(len(self.summaries_by_key(graph)[summary_key].collapsed_ids), 4)
+
+        graph = self.build(storey, max_depth=2, fanout_limit=2, expanded_summaries={summary_key})
+        self.assertNotIn(summary_key, self.summaries_by_key(graph))
+        self.assertTrue({element.id() for element in contained.RelatedElements} <= set(graph.keys))
+
+    def test_node_budget(self):
+        for node_budget in (5, 20, 40):
+            graph = self.build(max_depth=4, node_budget=node_budget)
+            budget_summaries = [key for key in self.summaries_by_key(graph) if key.endswith(addon.NODE_BUDGET_LABEL)]
+            fanout_summaries = len(graph.summaries) - len(budget_summaries)
+            self.assertLessEqual(len(graph) - fanout_summaries, node_budget)
+            self.assertTrue(budget_summaries)
+            self.assert_nothing_dropped(graph)
+
+    def test_node_budget_summary_per_truncated_entity(self):
+        self.ifc_file, root = make_tree(10)
+        graph = self.build(root, max_depth=3, node_budget=15)
+        self.assertLessEqual(len(graph), 15)
+        self.assert_nothing_dropped(graph)
+        # Every complex property in the graph was expanded and shows its values one way or the other
+        complex_ids = {entity.id() for entity in self.ifc_file.by_type("IfcComplexProperty")}
+        self.assertTrue(complex_ids & set(graph.keys) <= graph.expanded_forward)
+
+    def test_expanded_budget_summary(self):
+        self.ifc_file, root = make_tree(10)
+        graph = self.build(root, max_depth=3, node_budget=15)
+        summaries = self.summaries_by_key(graph)
+        summary_key = next(key for key in summaries if key.endswith(addon.NODE_BUDGET_LABEL))
+        expanded = self.build(root, max_depth=3, node_budget=15, expanded_summaries={summary_key})
+        # Only the expanded entity goes beyond the budget
+        self.assertTrue(set(summaries[summary_key].collapsed_ids) <= set(expanded.keys))
+        self.assertNotIn(summary_key, self.summaries_by_key(expanded))
+        self.assert_nothing_dropped(expanded)
+
+    def test_extension_covers_both_roots(self):
+        other = self.ifc_file.by_type("IfcSlab")[0]
+        extended = self.build(max_depth=1)
+        extended = self.build(other, max_depth=1, graph=extended.copy())
+        for root in (self.root, other):
+            fresh = self.build(root, max_depth=1)
+            self.assertTrue({key for key in fresh.keys if key > 0} <= set(extended.keys))
+        self.assertEqual(extended.selected, {other.id()})
+
+    def test_expansions_reset_when_roots_change(self):
+        settings = {"blacklist": [], "max_depth": 1}
+        addon.tool.Ifc.set(self.ifc_file)
+        self.addCleanup(addon.tool.Ifc.set, None)
+        addon._expanded_summaries.add("1:Expanded")
+        with mock.patch.object(addon, "get_attribute_graph_settings", return_value=settings), \
+                mock.patch.object(addon, "get_selected_roots", return_value=[self.root]):
+            # Also when the graph shown is extended, as refresh_live_graph does before it falls back
+            addon.build_selection_graph(mock.Mock(), graph=self.build(max_depth=1))
+        self.assertEqual(addon._expanded_summaries, set())
+        self.assertEqual(addon._expanded_root_ids, (self.root.id(),))
+
+
+if __name__ == "__main__":
+    unittest.main()
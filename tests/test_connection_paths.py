@@ -0,0 +1,81 @@
+"""Checks of the shortest connections between two entities against a breadth-first search and brute force"""
+
+import unittest
+from collections import deque
+
+from common import addon, make_model, requires_ifcopenshell
+
+# Rules that keep the brute force path enumeration small
+PATH_FILTER_RULES = ("OwnerHistory", "ContextOfItems", "RelatingPropertyDefinition", "IfcGeometricRepresentationItem")
+
+
+@requires_ifcopenshell
+class ConnectionSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.ifc_file = make_model()
+        relationship_filter = addon.compile_relationship_filter(self.ifc_file.schema, (), PATH_FILTER_RULES)
+        self.search = addon.ConnectionSearch(self.ifc_file, relationship_filter, budget=0)
+
+    def distances(self, start_id):
+        distances = {start_id: 0}
+        queue = deque([start_id])
+        while queue:
+            node = queue.popleft()
+            for neighbor, _ in self.search.neighbors(node):
+                if neighbor not in distances:
+                    distances[neighbor] = distances[node] + 1
+                    queue.append(neighbor)
+        return distances
+
+    def simple_paths(self, start_id, goal_id, max_length):
+        """Lengths of all loopless edge sequences from start_id to goal_id up to max_length"""
+        lengths = []
+        stack = [(start_id, {start_id}, 0)]
+        while stack:
+            node, visited, length = stack.pop()
+            if node == goal_id:
+                lengths.append(length)
+                continue
+            if length == max_length:
+                continue
+            for neighbor, _ in self.search.neighbors(node):
+                if neighbor not in visited:
+                    stack.append((neighbor, visited | {neighbor}, length + 1))
+        return sorted(lengths)
+
+    def assert_valid_path(self, path, start_id, goal_id):
+        nodes, edges = path
+        self.assertEqual((nodes[0], nodes[-1]), (start_id, goal_id))
+        self.assertEqual(len(set(nodes)), len(nodes))
+        for node, next_node, edge in zip(nodes, nodes[1:], edges):
+            self.assertIn((next_node, edge), self.search.neighbors(node))
+
+    def test_shortest_path_has_breadth_first_length(self):
+        start_id = self.ifc_file.by_type("IfcWall")[0].id()
+        distances = self.distances(start_id)
+        for goal_id, distance in distances.items():
+            path = self.search.shortest_path(start_id, goal_id)
+            self.assert_valid_path(path, start_id, goal_id)
+            self.assertEqual(len(path[1]), distance)
+
+    def test_k_shortest_paths_match_brute_force(self):
+        start_id = self.ifc_file.by_type("IfcWall")[0].id()
+        goal_id = self.ifc_file.by_type("IfcSlab")[-1].id()
+        paths = self.search.k_shortest_paths(start_id, goal_id, 4)
+        self.assertEqual(len(paths), 4)
+        for path in paths:
+            self.assert_valid_path(path, start_id, goal_id)
+        self.assertEqual(len({(tuple(nodes), tuple(edges)) for nodes, edges in paths}), len(paths))
+        lengths = [len(edges) for _, edges in paths]
+        self.assertEqual(lengths, self.simple_paths(start_id, goal_id, lengths[-1])[:len(paths)])
+
+    def test_budget_stops_the_search(self):
+        self.search.budget = 5
+        start_id = self.ifc_file.by_type("IfcWall")[0].id()
+        goal_id = self.ifc_file.by_type("IfcSlab")[-1].id()
+        self.assertEqual(self.search.k_shortest_paths(start_id, goal_id, 2), [])
+        self.assertTrue(self.search.budget_exhausted)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Checks of the attribute values shown in record labels"""
+
+import unittest
+
+from common import addon, make_model, requires_ifcopenshell
+
+
+class RecordingList(list):
+    """List that records the indices read through [], to check that formatting stays bounded"""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.read = set()
+
+    def __getitem__(self, index):
+        self.read.add(index)
+        return super().__getitem__(index)
+
+
+@requires_ifcopenshell
+class AggregateShapeTest(unittest.TestCase):
+    def test_shape_per_level(self):
+        points = [[float(i), 0.0, 1.0] for i in range(1000)]
+        self.assertEqual(addon.aggregate_shape(points), (0.0, ["1000", "3"], 3000))
+        self.assertEqual(addon.aggregate_shape((1, 2, 3)), (1, ["3"], 3))
+
+    def test_ragged_level(self):
+        leaf, dimensions, _ = addon.aggregate_shape([[1, 2], [3, 4, 5]])
+        self.assertEqual((leaf, dimensions), (1, ["2", "?"]))
+
+    def test_only_first_and_last_items_are_read(self):
+        value = RecordingList([[i, i] for i in range(1000)])
+        addon.aggregate_shape(value)
+        self.assertTrue(value.read <= {0, -1})
+
+
+@requires_ifcopenshell
+class FormatLabelValueTest(unittest.TestCase):
+    def test_scalars(self):
+        self.assertEqual(addon.format_label_value(None), "None")
+        self.assertEqual(addon.format_label_value(2.5), "2.5")
+        self.assertEqual(addon.format_label_value("Wall"), "Wall")
+
+    def test_long_string_is_truncated(self):
+        text = addon.format_label_value("x" * 1000)
+        self.assertEqual(len(text), addon.LABEL_VALUE_MAX_LENGTH)
+        self.assertTrue(text.endswith("..."))
+
+    def test_large_numeric_aggregate_shows_shape(self):
+        points = [(float(i), 0.0, 1.0) for i in range(12345)]
+        self.assertEqual(addon.format_label_value(points), "float[12345×3]")
+        self.assertEqual(addon.format_label_value((1.0, 2.0)), "(1.0, 2.0)")
+
+    def test_large_string_aggregate_is_truncated(self):
+        value = RecordingList([f"Name{i}" for i in range(100000)])
+        text = addon.format_label_value(value)
+        self.assertLessEqual(len(text), addon.LABEL_VALUE_MAX_LENGTH)
+        self.assertTrue(text.startswith("['Name0', 'Name1'"))
+
+    def test_entities(self):
+        ifc_file = make_model()
+        wall = ifc_file.by_type("IfcWall")[0]
+        self.assertEqual(addon.format_label_value(wall), f"#{wall.id()} IfcWall")
+        self.assertEqual(addon.format_label_value(ifc_file.by_type("IfcWall")), "[4 items]")
+
+
+if __name__ == "__main__":
+    unittest.main()
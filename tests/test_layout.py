@@ -0,0 +1,35 @@
+"""Checks of the output resolution chosen for Graphviz layouts"""
+
+import unittest
+
+from common import addon, requires_ifcopenshell
+
+
+def make_layout(width, height, node_count=10):
+    return addon.GraphLayout(f'digraph {{ graph [bb="0,0,{width},{height}"]; }}', node_count)
+
+
+@requires_ifcopenshell
+class ChooseDpiTest(unittest.TestCase):
+    def test_small_layout_is_sharp(self):
+        dpi, fits_budget = addon.choose_dpi(make_layout(200, 100))
+        self.assertTrue(fits_budget)
+        self.assertEqual(dpi, addon.MAX_DPI)
+
+    def test_dpi_stays_within_pixel_budget(self):
+        layout = make_layout(2000, 1000)
+        pixel_budget = layout.pixels_at(addon.MIN_READABLE_DPI) * 2
+        dpi, fits_budget = addon.choose_dpi(layout, pixel_budget=pixel_budget)
+        self.assertTrue(fits_budget)
+        self.assertLessEqual(layout.pixels_at(dpi), pixel_budget * 1.0001)
+
+    def test_overview_of_layout_beyond_budget(self):
+        layout = make_layout(20000, 10000)
+        pixel_budget = layout.pixels_at(addon.MIN_READABLE_DPI) / 4
+        dpi, fits_budget = addon.choose_dpi(layout, pixel_budget=pixel_budget)
+        self.assertFalse(fits_budget)
+        self.assertAlmostEqual(layout.pixels_at(dpi), pixel_budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
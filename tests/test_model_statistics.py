@@ -0,0 +1,40 @@
+"""Checks of the model overview statistics against direct counts"""
+
+import unittest
+from collections import Counter
+
+from common import addon, forward_ids, make_model, requires_ifcopenshell
+
+
+@requires_ifcopenshell
+class ModelStatisticsTest(unittest.TestCase):
+    def setUp(self):
+        self.ifc_file = make_model()
+        self.statistics = addon.ModelStatistics(self.ifc_file)
+
+    def test_top_classes(self):
+        counts = Counter(entity.is_a() for entity in self.ifc_file)
+        top_classes = self.statistics.top_classes(5)
+        self.assertEqual(len(top_classes), 5)
+        self.assertEqual([instances for _, instances in top_classes], sorted(counts.values(), reverse=True)[:5])
+        for class_name, instances in top_classes:
+            self.assertEqual(counts[class_name], instances)
+
+    def test_top_referrers(self):
+        out_degrees = {entity.id(): len(list(forward_ids(entity))) for entity in self.ifc_file}
+        top_referrers = self.statistics.top_referrers(5)
+        self.assertEqual([out_degree for _, _, out_degree in top_referrers],
+                         sorted(out_degrees.values(), reverse=True)[:5])
+        for entity_id, class_name, out_degree in top_referrers:
+            self.assertEqual(out_degrees[entity_id], out_degree)
+            self.assertEqual(self.ifc_file.by_id(entity_id).is_a(), class_name)
+
+    def test_top_hubs(self):
+        in_degrees = Counter(target_id for entity in self.ifc_file for target_id in forward_ids(entity))
+        hubs = self.statistics.top_hubs(3)
+        self.assertEqual([in_degree for _, _, in_degree, _, _ in hubs],
+                         [in_degree for _, in_degree in in_degrees.most_common(3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""Checks of the relationship toggles and filter rules"""
+
+import unittest
+
+from common import addon, make_model, requires_ifcopenshell
+
+
+@requires_ifcopenshell
+class RelationshipFilterTest(unittest.TestCase):
+    def test_material_toggle_covers_subtypes(self):
+        relationship_filter = addon.compile_relationship_filter("IFC4", ("material",), ())
+        for class_name in ("IfcRelAssociatesMaterial", "IfcMaterialLayerSetUsage", "IfcMaterialProfileSetUsage",
+                           "IfcMaterialProfileSet", "IfcMaterialConstituentSet", "IfcMaterialProfile"):
+            self.assertIn(class_name, relationship_filter.hidden_classes)
+        self.assertNotIn("IfcWall", relationship_filter.hidden_classes)
+        self.assertNotIn("IfcRelAssociatesClassification", relationship_filter.hidden_classes)
+
+    def test_material_toggle_skips_classes_missing_from_schema(self):
+        relationship_filter = addon.compile_relationship_filter("IFC2X3", ("material",), ())
+        self.assertIn("IfcMaterialLayerSetUsage", relationship_filter.hidden_classes)
+        self.assertNotIn("IfcMaterialProfileSet", relationship_filter.hidden_classes)
+
+    def test_scoped_attribute_rule(self):
+        relationship_filter = addon.compile_relationship_filter("IFC4", (), ("OwnerHistory", "IfcWall.Name"))
+        self.assertEqual(relationship_filter.attributes_hidden_on("IfcWallStandardCase"), {"OwnerHistory", "Name"})
+        self.assertEqual(relationship_filter.attributes_hidden_on("IfcSlab"), {"OwnerHistory"})
+
+    def test_inverse_edges_follow_attribute_rules(self):
+        ifc_file = make_model()
+        wall = ifc_file.by_type("IfcWall")[0]
+        graph = addon.build_recursive_attribute_graph(wall, blacklist=["ObjectPlacement"], max_depth=1,
+                                                      ifc_file=ifc_file)
+        self.assertNotIn("ObjectPlacement", {label for _, _, label in graph.iter_edges()})
+        placement = ifc_file.by_type("IfcLocalPlacement")[0]
+        graph = addon.build_recursive_attribute_graph(placement, blacklist=["PlacementRelTo"], max_depth=1,
+                                                      ifc_file=ifc_file)
+        self.assertNotIn("(inverse) PlacementRelTo", {label for _, _, label in graph.iter_edges()})
+
+
+if __name__ == "__main__":
+    unittest.main()
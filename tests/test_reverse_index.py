@@ -0,0 +1,63 @@
+"""Checks of ReverseReferenceIndex against ifcopenshell's own inverse lookup"""
+
+import unittest
+from unittest import mock
+
+from common import addon, ifcopenshell, make_model, requires_ifcopenshell
+
+
+@requires_ifcopenshell
+class ReverseReferenceIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.ifc_file = make_model()
+        self.index = addon.ReverseReferenceIndex(self.ifc_file)
+
+    def assert_matches_file(self):
+        for entity in self.ifc_file:
+            expected = sorted(referrer.id() for referrer in self.ifc_file.get_inverse(entity))
+            actual = sorted({referrer.id() for referrer, _ in self.index.referrers(entity.id())})
+            self.assertEqual(actual, expected, entity)
+
+    def test_initial_index(self):
+        self.assert_matches_file()
+
+    def test_lookups_before_edits_decode_nothing(self):
+        with mock.patch.object(addon, "iter_referenced_ids", side_effect=AssertionError("attribute decoded")):
+            self.assert_matches_file()
+
+    def test_refresh_after_edits(self):
+        wall = self.ifc_file.by_type("IfcWall")[0]
+        slab = self.ifc_file.by_type("IfcSlab")[0]
+        # A created entity, a rewritten attribute and a removed entity
+        self.ifc_file.createIfcRelConnectsElements(ifcopenshell.guid.new(), None, None, None, None, wall, slab)
+        wall.ObjectPlacement = slab.ObjectPlacement
+        self.ifc_file.remove(self.ifc_file.by_type("IfcRelDefinesByType")[0])
+        self.index.note_edit({"product": wall})
+        self.assert_matches_file()
+        self.assertIn(wall.id(), self.index.stale_ids)
+
+
+@requires_ifcopenshell
+class InverseDepthTest(unittest.TestCase):
+    def setUp(self):
+        self.ifc_file = make_model()
+        self.root = self.ifc_file.by_type("IfcWall")[0]
+
+    def build(self, **settings):
+        return addon.build_recursive_attribute_graph(self.root, blacklist=[], max_depth=1, ifc_file=self.ifc_file,
+                                                     **settings)
+
+    def test_inverse_depth(self):
+        referrers = {referrer.id() for referrer in self.ifc_file.get_inverse(self.root)}
+        self.assertTrue(referrers <= set(self.build(inverse_depth=1).keys))
+        self.assertFalse(referrers & set(self.build(show_inverse=False).keys))
+
+        # With a deeper inverse depth, the referrers of the root's referrers are followed too
+        second_ring = {referrer.id() for rel in referrers
+                       for referrer in self.ifc_file.get_inverse(self.ifc_file.by_id(rel))}
+        graph = self.build(inverse_depth=2)
+        self.assertTrue(second_ring <= set(graph.keys))
+
+
+if __name__ == "__main__":
+    unittest.main()